@@ -0,0 +1,71 @@
+"""
+Per-query overhead of the chat workflow graph.
+
+Compares rebuilding and compiling the StateGraph on every query (the old
+behaviour of process_chat_query) with invoking a graph compiled once. Node
+functions are replaced with no-ops so only graph construction and dispatch
+are measured.
+
+    python benchmarks/bench_chat_workflow.py --queries 200
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from insighter.pipelines import chat
+
+
+def noop_node(state):
+    return state
+
+
+def make_state():
+    return {
+        "user_query": "average sales per region",
+        "project_name": "benchmark",
+        "project_path": "",
+        "file_paths": {},
+        "engine": "sqlite",
+        "columns": "",
+        "insights": "",
+        "router_response": None,
+        "action": None,
+        "agent_response": None,
+        "db_connection": None,
+        "metadata_result": None,
+        "sql_result": None,
+        "image": None,
+        "prompt_tokens": None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    for name in ["load_csv_to_sql_node", "extract_metadata_node", "route_query_node", "branch_node"]:
+        setattr(chat, name, noop_node)
+
+    start = time.perf_counter()
+    for _ in range(args.queries):
+        chat.create_chat_workflow().invoke(make_state())
+    rebuild = (time.perf_counter() - start) / args.queries
+
+    compiled = chat.create_chat_workflow()
+    start = time.perf_counter()
+    for _ in range(args.queries):
+        compiled.invoke(make_state())
+    reuse = (time.perf_counter() - start) / args.queries
+
+    print(f"queries:               {args.queries}")
+    print(f"rebuilt per query:     {rebuild * 1000:.2f} ms/query")
+    print(f"compiled once:         {reuse * 1000:.2f} ms/query")
+    print(f"overhead removed:      {(rebuild - reuse) * 1000:.2f} ms/query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+Load test: many concurrent chat sessions against a fake-latency LLM backend.
+
+Each simulated session runs on its own thread, as Streamlit runs each
+session's script, with its own project holding a copy of a synthetic sales
+CSV. A session repeatedly picks an action from --mix and calls
+process_chat_query, or run_insight_pipeline for "insights". LLM calls
+go through the real gateway to the fake backend, which sleeps for
+--llm-latency-ms, so queuing, rate limiting and local work are all real.
+The gateway uses the configured provider limits unless --rpm, --tpm or
+--gateway-concurrency override them, and it starts fresh for each session
+count. One-time warm-up costs are paid before the clock starts.
+
+For each session count in --sessions, it reports throughput, p50/p95/p99
+latency per action, CPU use and peak RSS. Throughput that stops growing
+with more sessions, or latency that grows with them, shows where an
+instance saturates.
+
+    python benchmarks/bench_concurrent_sessions.py --sessions 1 10 25 50 --duration 30
+    python benchmarks/bench_concurrent_sessions.py --sessions 20 --mix sql=60,chat=20,insights=20 --llm-latency-ms 1500
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import streamlit.logger as streamlit_logger
+
+from bench_data_scale import PeakRSS, generate_csv
+from insighter.config import settings
+from insighter.pipelines.chat import process_chat_query
+from insighter.utils.database import sync_project_db
+from insighter.utils.insights import run_insight_pipeline
+from insighter.utils.llm_backends import FakeBackend, set_llm_backend
+from insighter.utils.llm_gateway import get_gateway_stats, reset_llm_gateway, set_llm_user
+
+DEFAULT_MIX = "sql=40,visualization=10,alert=5,comparison=10,insight_details=10,chat=15,insights=10"
+
+# Questions each action is routed to by the local router (SQL questions may fall through to the fake LLM router)
+QUESTIONS = {
+    "sql": ["total SalesAmount per Region", "average Discount by CustomerSegment", "top 10 customers by spend", "how many orders per AdChannel"],
+    "visualization": ["plot SalesAmount by Region", "draw a bar chart of orders per AdChannel"],
+    "alert": ["create an alert if sales drop below 1000", "notify me when AdSpend exceeds 4000"],
+    "comparison": ["compare these insights", "compare the selected insights for differences"],
+    "insight_details": ["list the selected insights", "explain the context of these insights"],
+    "chat": ["hello, what does this data contain?", "how are you today?"],
+}
+
+
+def parse_mix(text):
+    mix = {}
+
+    for part in text.split(","):
+        action, _, weight = part.partition("=")
+        action = action.strip()
+        if action not in QUESTIONS and action != "insights":
+            raise ValueError(f"Unknown action in --mix: {action}")
+        mix[action] = float(weight or 1)
+
+    return mix
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def selected_insights_from(final_dict, file_name):
+    """Insights in the shape the chat page passes to the pipeline"""
+    return {
+        f"selected_{file_name}_{index}": {
+            "insight_question": key, "insight_summary": value.get("insight_summary", ""),
+            "insight_query": value.get("sql_query", ""), "insight_data": value.get("result", {}),
+            "is_selected": True, "file_name": file_name, "selection_order": index,
+        }
+        for index, (key, value) in enumerate((final_dict or {}).get("sql_queries", {}).items())
+    }
+
+
+def setup_sessions(count, workdir, source_csv):
+    """One project per session, ingested and with insights generated before the clock starts"""
+    sessions = []
+
+    for index in range(count):
+        project_path = os.path.join(workdir, f"session-{index}")
+        os.makedirs(project_path, exist_ok=True)
+        file_path = os.path.join(project_path, "sales.csv")
+        shutil.copyfile(source_csv, file_path)
+
+        sync_project_db(project_path, {"sales.csv": file_path})
+        insights = run_insight_pipeline(file_path)
+        project = {"path": project_path, "files": ["sales.csv"], "file_paths": {"sales.csv": file_path}, "engine": "sqlite"}
+        sessions.append({"name": f"session-{index}", "project": project, "selected_insights": selected_insights_from(insights, "sales.csv")})
+
+    return sessions
+
+
+def warm_up(session, mix):
+    """Run every action once so the router model, chains and visualization workers exist before measuring"""
+    set_llm_user(session["name"])
+
+    for action in mix:
+        if action != "insights":
+            process_chat_query(QUESTIONS[action][0], session["selected_insights"], session["name"], session["project"])
+
+
+def run_session(session, mix, deadline, max_requests, think_seconds, seed, records):
+    set_llm_user(session["name"])
+    rng = random.Random(seed)
+    actions, weights = list(mix), list(mix.values())
+    project = session["project"]
+    request = 0
+
+    while time.perf_counter() < deadline and (not max_requests or request < max_requests):
+        action = rng.choices(actions, weights)[0]
+        # Conversation context like the chat page's keeps each prompt distinct, so requests are not coalesced
+        question = f"Session {session['name']}, request {request}\nCurrent question: {rng.choice(QUESTIONS.get(action, ['']))}"
+        start = time.perf_counter()
+        error = None
+
+        try:
+            if action == "insights":
+                run_insight_pipeline(project["file_paths"]["sales.csv"], resume=False)
+            else:
+                process_chat_query(question, session["selected_insights"], session["name"], project)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+
+        records.append({"action": action, "seconds": time.perf_counter() - start, "error": error})
+        request += 1
+
+        if think_seconds:
+            time.sleep(rng.expovariate(1 / think_seconds))
+
+
+def run_level(sessions, mix, args):
+    records = []
+    reset_llm_gateway()
+    deadline = time.perf_counter() + args.duration
+    cpu_before = os.times()
+
+    threads = [
+        threading.Thread(
+            target=run_session, name=session["name"],
+            args=(session, mix, deadline, args.requests_per_session, args.think_ms / 1000, args.seed + index, records)
+        )
+        for index, session in enumerate(sessions)
+    ]
+
+    with PeakRSS() as rss, contextlib.redirect_stdout(sys.stdout if args.verbose else io.StringIO()):
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+
+    cpu_after = os.times()
+    cpu_seconds = (cpu_after.user - cpu_before.user) + (cpu_after.system - cpu_before.system)
+    gateway = get_gateway_stats()
+
+    by_action = defaultdict(list)
+    for record in records:
+        by_action[record["action"]].append(record)
+
+    def summary(items):
+        latencies = [item["seconds"] for item in items if not item["error"]]
+        return {
+            "requests": len(items), "errors": sum(1 for item in items if item["error"]),
+            "p50_s": percentile(latencies, 50), "p95_s": percentile(latencies, 95), "p99_s": percentile(latencies, 99),
+        }
+
+    return {
+        "sessions": len(sessions), "wall_seconds": round(wall, 2),
+        "throughput_rps": round(len(records) / wall, 3) if wall else None,
+        "cpu_seconds": round(cpu_seconds, 2), "cpu_cores_used": round(cpu_seconds / wall, 2) if wall else None,
+        "peak_rss_mb": round(rss.peak_mb, 1),
+        "gateway_wait_seconds": round(gateway.get("waited_seconds", 0), 2),
+        "gateway_rate_limited": gateway.get("rate_limited", 0),
+        "overall": summary(records),
+        "actions": {action: summary(items) for action, items in sorted(by_action.items())},
+        "errors": sorted({record["error"] for record in records if record["error"]})[:10],
+    }
+
+
+def format_seconds(value):
+    return f"{value:.2f}" if value is not None else "-"
+
+
+def print_level(result):
+    overall = result["overall"]
+    print(
+        f"\n{result['sessions']} sessions: {overall['requests']} requests in {result['wall_seconds']}s, "
+        f"{result['throughput_rps']} req/s, {overall['errors']} errors, CPU {result['cpu_cores_used']} cores, "
+        f"peak RSS {result['peak_rss_mb']:.0f} MB, {result['gateway_wait_seconds']}s queued in the LLM gateway "
+        f"({result['gateway_rate_limited']} rate limited)"
+    )
+    print(f"  {'action':<18}{'requests':>9}{'errors':>8}{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}")
+
+    for action, stats in [*result["actions"].items(), ("all", overall)]:
+        print(
+            f"  {action:<18}{stats['requests']:>9}{stats['errors']:>8}{format_seconds(stats['p50_s']):>9}"
+            f"{format_seconds(stats['p95_s']):>9}{format_seconds(stats['p99_s']):>9}"
+        )
+
+    for error in result["errors"]:
+        print(f"  error: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10, 25])
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per session count")
+    parser.add_argument("--requests-per-session", type=int, default=0, help="stop each session after this many requests (0: run for --duration)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="action weights, e.g. sql=60,chat=20,insights=20")
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--think-ms", type=float, default=0.0, help="mean pause between a session's requests")
+    parser.add_argument("--rows", type=int, default=50000, help="rows in each session's dataset")
+    parser.add_argument("--rpm", type=int, help="override LLM_GATEWAY_REQUESTS_PER_MINUTE")
+    parser.add_argument("--tpm", type=int, help="override LLM_GATEWAY_TOKENS_PER_MINUTE")
+    parser.add_argument("--gateway-concurrency", type=int, help="override LLM_GATEWAY_MAX_CONCURRENCY")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="keep the pipelines' own logging")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    streamlit_logger.set_log_level("error")
+
+    # The gateway reads its limits from settings whenever it is (re)built
+    for name, value in [("LLM_GATEWAY_REQUESTS_PER_MINUTE", args.rpm), ("LLM_GATEWAY_TOKENS_PER_MINUTE", args.tpm), ("LLM_GATEWAY_MAX_CONCURRENCY", args.gateway_concurrency)]:
+        if value:
+            setattr(settings, name, value)
+    workdir = tempfile.mkdtemp(prefix="insighter_load_")
+    results = []
+
+    try:
+        source_csv = os.path.join(workdir, "sales.csv")
+        generate_csv(source_csv, args.rows)
+
+        set_llm_backend(FakeBackend(latency_ms=0))
+        with contextlib.redirect_stdout(sys.stdout if args.verbose else io.StringIO()):
+            sessions = setup_sessions(max(args.sessions), workdir, source_csv)
+            warm_up(sessions[0], mix)
+
+        set_llm_backend(FakeBackend(latency_ms=args.llm_latency_ms, seed=args.seed))
+        print(
+            f"Mix: {mix}; LLM latency {args.llm_latency_ms:.0f} ms; {args.rows:,} rows per session; gateway "
+            f"{settings.LLM_GATEWAY_REQUESTS_PER_MINUTE} req/min, {settings.LLM_GATEWAY_TOKENS_PER_MINUTE} tokens/min, "
+            f"{settings.LLM_GATEWAY_MAX_CONCURRENCY} concurrent"
+        )
+
+        for count in args.sessions:
+            results.append(run_level(sessions[:count], mix, args))
+            print_level(results[-1])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if len(results) > 1:
+        print(f"\n{'sessions':>9}{'req/s':>9}{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}{'CPU cores':>11}{'RSS MB':>9}")
+        for result in results:
+            overall = result["overall"]
+            print(
+                f"{result['sessions']:>9}{result['throughput_rps']:>9}{format_seconds(overall['p50_s']):>9}{format_seconds(overall['p95_s']):>9}"
+                f"{format_seconds(overall['p99_s']):>9}{result['cpu_cores_used']:>11}{result['peak_rss_mb']:>9.0f}"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+How ingestion, metadata extraction and query execution scale with data size.
+
+Generates synthetic CSVs mixing numeric, categorical, date and free-text
+columns (plus wide variants with many extra columns) and runs each stage the
+app runs on them: load_csv_to_sql_node, the insight and chat
+extract_metadata_node (cold and warm metadata cache), execute_sql_queries_node,
+the file_view statistics and chat SQL execution. Each stage reports wall time
+and peak RSS; stages that process the rows (ingest, statistics, queries) also
+report rows/s, while the metadata stages report elapsed ms only. LLM calls go
+to the fake backend with no latency, so only Insighter's own work is measured.
+The index advisor is switched off so its background index builds do not run
+into later stages. Results are written as JSON; pass an earlier result file to
+--compare to see the change per stage.
+
+    python benchmarks/bench_data_scale.py --rows 10000 1000000 20000000 --wide-rows 100000
+    python benchmarks/bench_data_scale.py --rows 10000 --compare benchmarks/results/data_scale-previous.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from insighter.config import settings
+from insighter.models import chat_agents, insight_agents
+from insighter.pipelines import chat, insights
+from insighter.pages.file_view import summarize_file
+from insighter.utils.database import table_name_for
+from insighter.utils.engines import get_engine
+from insighter.utils.llm_backends import FakeBackend, set_llm_backend
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REGIONS = np.array(["North", "South", "East", "West", "Central"])
+SEGMENTS = np.array(["Consumer", "Corporate", "Small Business"])
+CHANNELS = np.array(["Search", "Social", "Email", "Display", "Affiliate"])
+
+INSIGHT_QUERIES = {
+    "sales_by_region": 'SELECT Region, SUM(SalesAmount) AS total_sales FROM "{table}" GROUP BY Region ORDER BY total_sales DESC',
+    "spend_by_channel_segment": 'SELECT AdChannel, CustomerSegment, AVG(AdSpend), AVG(ConversionRate) FROM "{table}" GROUP BY AdChannel, CustomerSegment',
+    "monthly_revenue": 'SELECT strftime(\'%Y-%m\', OrderDate) AS month, SUM(SalesAmount) FROM "{table}" GROUP BY month ORDER BY month',
+    "top_customers": 'SELECT CustomerID, SUM(SalesAmount) AS spend FROM "{table}" GROUP BY CustomerID ORDER BY spend DESC LIMIT 10',
+}
+
+CHAT_QUERIES = {
+    "filtered aggregate": 'SELECT COUNT(*), AVG(Discount) FROM "{table}" WHERE SalesAmount > 500 AND Region = \'North\'',
+    "raw rows page": 'SELECT * FROM "{table}" WHERE IsReturning = 1',
+    "distinct products per region": 'SELECT Region, COUNT(DISTINCT ProductName) FROM "{table}" GROUP BY Region',
+}
+
+
+def generate_csv(path, rows, extra_columns=0, seed=7, chunk_rows=500000):
+    """Sales-like data; extra columns alternate between metrics, low-cardinality dimensions and dates"""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2022-01-01")
+    header = True
+
+    for offset in range(0, rows, chunk_rows):
+        n = min(chunk_rows, rows - offset)
+        chunk = {
+            "OrderID": np.arange(offset, offset + n),
+            "OrderDate": (start + rng.integers(0, 730, n).astype("timedelta64[D]")).astype(str),
+            "OrderTime": (start + rng.integers(0, 730 * 86400, n).astype("timedelta64[s]")).astype(str),
+            "CustomerID": rng.integers(1, 50000, n),
+            "ProductName": np.char.add("Product ", rng.integers(1, 20000, n).astype(str)),
+            "Region": REGIONS[rng.integers(0, len(REGIONS), n)],
+            "CustomerSegment": SEGMENTS[rng.integers(0, len(SEGMENTS), n)],
+            "AdChannel": CHANNELS[rng.integers(0, len(CHANNELS), n)],
+            "IsReturning": rng.integers(0, 2, n).astype(bool),
+            "AdSpend": rng.uniform(10, 5000, n).round(2),
+            "ConversionRate": rng.random(n).round(4),
+            "SalesAmount": rng.uniform(5, 2000, n).round(2),
+            "Discount": rng.uniform(0, 0.3, n).round(2),
+        }
+
+        for index in range(extra_columns):
+            if index % 3 == 0:
+                chunk[f"Metric{index}"] = rng.normal(100, 15, n).round(3)
+            elif index % 3 == 1:
+                chunk[f"Dimension{index}"] = np.char.add("level_", rng.integers(0, 12, n).astype(str))
+            else:
+                chunk[f"EventDate{index}"] = (start + rng.integers(0, 365, n).astype("timedelta64[D]")).astype(str)
+
+        pd.DataFrame(chunk).to_csv(path, mode="w" if header else "a", header=header, index=False)
+        header = False
+
+
+class PeakRSS:
+    """Peak resident set size while the block runs, sampled from /proc (falls back to the process-wide peak)"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak_mb = self.start_mb = None
+        self._stop = threading.Event()
+
+    @staticmethod
+    def current_mb():
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+        except (OSError, ValueError):
+            return None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb or 0, self.current_mb() or 0)
+
+    def __enter__(self):
+        self.peak_mb = self.start_mb = self.current_mb()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+        if self.peak_mb is None:
+            import resource
+            self.peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        else:
+            self.peak_mb = max(self.peak_mb, self.current_mb() or 0)
+
+
+def run_stage(results, dataset, stage, rows, fn, per_row=True):
+    """Time one stage; stages that do not scan the data (per_row=False) report elapsed ms only, not rows/s"""
+    with PeakRSS() as rss:
+        start = time.perf_counter()
+        output = fn()
+        seconds = time.perf_counter() - start
+
+    results.append({
+        "dataset": dataset, "stage": stage, "rows": rows, "seconds": round(seconds, 4), "ms": round(seconds * 1000, 2),
+        "rows_per_second": round(rows / seconds) if per_row and seconds > 0 else None, "peak_rss_mb": round(rss.peak_mb, 1),
+        "start_rss_mb": round(rss.start_mb, 1) if rss.start_mb is not None else None,
+    })
+
+    if per_row:
+        print(f"  {stage:<28}{seconds:>10.3f}s{results[-1]['rows_per_second'] or 0:>16,} rows/s{rss.peak_mb:>10.0f} MB")
+    else:
+        print(f"  {stage:<28}{seconds * 1000:>9.1f}ms{'-':>23}{rss.peak_mb:>10.0f} MB")
+    return output
+
+
+def chat_metadata(project_path, file_paths, user_query):
+    state = chat.load_csv_to_sql_node({"project_path": project_path, "file_paths": file_paths, "engine": "sqlite"})
+
+    try:
+        state["user_query"] = user_query
+        return chat.extract_metadata_node(state)
+    finally:
+        state["db_connection"].close()
+
+
+def chat_queries(project_path, file_paths, table):
+    conn = get_engine("sqlite", project_path, file_paths).connect()
+
+    try:
+        return {label: chat.execute_sql_query(conn, sql.format(table=table)) for label, sql in CHAT_QUERIES.items()}
+    finally:
+        conn.close()
+
+
+def bench_dataset(results, dataset, rows, extra_columns, workdir):
+    project_path = os.path.join(workdir, dataset)
+    os.makedirs(project_path, exist_ok=True)
+    file_name = "sales.csv"
+    file_path = os.path.join(project_path, file_name)
+    file_paths = {file_name: file_path}
+    table = table_name_for(file_name)
+
+    start = time.perf_counter()
+    generate_csv(file_path, rows, extra_columns)
+    size_mb = os.path.getsize(file_path) / (1024 * 1024)
+    print(f"\n{dataset}: {rows:,} rows x {13 + extra_columns} columns, {size_mb:.0f} MB CSV (generated in {time.perf_counter() - start:.1f}s)")
+
+    state = {"file_path": file_path, "engine": "sqlite"}
+    state.update(run_stage(results, dataset, "load_csv_to_sql_node", rows, lambda: insights.load_csv_to_sql_node(state)))
+
+    # Metadata comes from the schema, the column summary and the cache, not a scan of every row
+    run_stage(results, dataset, "insight metadata (cold)", rows, lambda: insights.extract_metadata_node(state), per_row=False)
+    run_stage(results, dataset, "insight metadata (warm)", rows, lambda: insights.extract_metadata_node(state), per_row=False)
+
+    question = "total SalesAmount per Region for Corporate customers"
+    run_stage(results, dataset, "chat metadata (cold)", rows, lambda: chat_metadata(project_path, file_paths, question), per_row=False)
+    run_stage(results, dataset, "chat metadata (warm)", rows, lambda: chat_metadata(project_path, file_paths, question), per_row=False)
+
+    state["sql_queries"] = {"sql_queries": {key: {"sql_query": sql.format(table=table)} for key, sql in INSIGHT_QUERIES.items()}}
+    run_stage(results, dataset, "execute_sql_queries_node", rows, lambda: insights.execute_sql_queries_node(state))
+
+    run_stage(results, dataset, "file_view statistics", rows, lambda: summarize_file(file_path))
+    run_stage(results, dataset, "chat sql execution", rows, lambda: chat_queries(project_path, file_paths, table))
+
+    os.remove(file_path)
+
+
+def git_version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, previous_path):
+    with open(previous_path) as f:
+        previous = {(entry["dataset"], entry["stage"]): entry for entry in json.load(f)["results"]}
+
+    print(f"\nChange vs {previous_path}:")
+    for entry in results:
+        before = previous.get((entry["dataset"], entry["stage"]))
+        if before and before["seconds"]:
+            change = (entry["seconds"] - before["seconds"]) / before["seconds"]
+            print(f"  {entry['dataset']:<16}{entry['stage']:<28}{before['seconds']:>10.3f}s ->{entry['seconds']:>9.3f}s ({change:+.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 1000000])
+    parser.add_argument("--wide-rows", type=int, nargs="*", default=[100000], help="row counts for the wide-table variant")
+    parser.add_argument("--wide-columns", type=int, default=60, help="extra columns in the wide variant")
+    parser.add_argument("--output", help="result JSON path (default benchmarks/results/data_scale-<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier result JSON to compare against")
+    args = parser.parse_args()
+
+    set_llm_backend(FakeBackend(latency_ms=0))
+    # execute_sql_queries_node would otherwise start index builds that overlap the later stages
+    settings.INDEX_ADVISOR_ENABLED = False
+
+    # Build the chains up front so langchain's import cost is not charged to the first dataset
+    for agents in (chat_agents, insight_agents):
+        for name in agents.CHAIN_PROMPTS:
+            agents.get_chain(name)
+    workdir = tempfile.mkdtemp(prefix="insighter_scale_")
+    datasets = [(f"narrow-{rows}", rows, 0) for rows in args.rows]
+    datasets += [(f"wide-{rows}", rows, args.wide_columns) for rows in args.wide_rows]
+    results = []
+
+    print(f"{'stage':<30}{'wall time':>11}{'throughput':>23}{'peak RSS':>10}")
+
+    try:
+        for dataset, rows, extra_columns in datasets:
+            bench_dataset(results, dataset, rows, extra_columns, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"data_scale-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+    with open(output, "w") as f:
+        json.dump({
+            "version": git_version(), "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+            "platform": platform.platform(), "cpu_count": os.cpu_count(), "results": results,
+        }, f, indent=2)
+
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
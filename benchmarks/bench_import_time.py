@@ -0,0 +1,110 @@
+"""
+Import time of app startup and of each page, as a regression check.
+
+Each target is imported in a fresh interpreter under `python -X importtime`
+(best of --repeat runs). "startup" is everything app.py imports at the top
+plus the dashboard page; the other targets are the page modules its router
+loads on first visit. The check fails (exit code 1) when startup exceeds
+--budget-ms or pulls in a module that should only load on first use.
+
+    python benchmarks/bench_import_time.py --budget-ms 1500
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy dependencies that must stay out of startup: chains, graphs, the OpenAI client and plotting
+DEFERRED_MODULES = ["langchain", "langchain_core", "langchain_community", "langgraph", "openai", "matplotlib"]
+
+
+def app_targets():
+    """Startup imports and page modules, read from app.py so the benchmark follows the router"""
+    with open(os.path.join(ROOT, "app.py")) as f:
+        tree = ast.parse(f.read())
+
+    startup, pages = [], {}
+
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            startup.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            startup.append(node.module)
+        elif isinstance(node, ast.Assign) and any(getattr(target, "id", None) == "PAGES" for target in node.targets):
+            pages = {page: module for page, (module, _) in ast.literal_eval(node.value).items()}
+
+    if "dashboard" in pages:
+        startup.append(pages.pop("dashboard"))
+    return {"startup": startup, **{f"page:{page}": [module] for page, module in pages.items()}}
+
+
+def run_python(*args):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env=env, capture_output=True, text=True)
+
+
+def measure(modules):
+    """Cumulative import time (ms) of each top-level module loaded while importing the given modules"""
+    result = run_python("-X", "importtime", "-c", f"import {', '.join(modules)}")
+
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    timings = {}
+
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _, cumulative, name = line.split("|")
+        # Top-level imports are not indented; nested ones are already counted in their parent
+        if not name.startswith("  ", 1):
+            timings[name.strip()] = int(cumulative) / 1000
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    parser.add_argument("--top", type=int, default=8, help="slowest startup modules to list")
+    args = parser.parse_args()
+
+    failures = []
+    startup_timings = None
+
+    print(f"{'target':<28}{'import time':>14}")
+    print("-" * 42)
+
+    for label, modules in app_targets().items():
+        runs = [measure(modules) for _ in range(args.repeat)]
+        best = min(runs, key=lambda timings: sum(timings.values()))
+        total = sum(best.values())
+        print(f"{label:<28}{total:>12.1f}ms")
+
+        if label == "startup":
+            startup_timings = best
+            loaded = run_python("-c", f"import sys, {', '.join(modules)}; print(' '.join(sys.modules))").stdout.split()
+            eager = sorted({module for module in DEFERRED_MODULES if module in loaded})
+
+            if total > args.budget_ms:
+                failures.append(f"startup imports take {total:.0f}ms, over the {args.budget_ms:.0f}ms budget")
+            if eager:
+                failures.append(f"startup imports modules that should load on first use: {', '.join(eager)}")
+
+    print("\nSlowest modules imported at startup:")
+    for name, ms in sorted(startup_timings.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {name:<40}{ms:>10.1f}ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+SQLite store vs DuckDB on typical insight-agent queries.
+
+Generates a synthetic sales CSV, ingests it into a scratch project store and
+times each query (best of --repeat runs) on SQLite, on DuckDB reading the CSV
+and on DuckDB reading a Parquet copy of it.
+
+    python benchmarks/bench_query_engines.py --rows 1000000
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from insighter.utils.database import sync_project_db, table_name_for
+from insighter.utils.engines import get_engine
+
+FILE_NAME = "sales.csv"
+TABLE = table_name_for(FILE_NAME)
+
+QUERIES = {
+    "sales by region": f"SELECT Region, SUM(SalesAmount) AS total_sales FROM {TABLE} GROUP BY Region ORDER BY total_sales DESC",
+    "avg spend by channel and segment": f"SELECT AdChannel, CustomerSegment, AVG(AdSpend), AVG(ConversionRate) FROM {TABLE} GROUP BY AdChannel, CustomerSegment",
+    "monthly revenue": f"SELECT strftime('%Y-%m', OrderDate) AS month, SUM(SalesAmount) FROM {TABLE} GROUP BY month ORDER BY month",
+    "top customers": f"SELECT CustomerID, SUM(SalesAmount) AS spend FROM {TABLE} GROUP BY CustomerID ORDER BY spend DESC LIMIT 10",
+    "distinct products per region": f"SELECT Region, COUNT(DISTINCT ProductID) FROM {TABLE} GROUP BY Region",
+    "filtered aggregate": f"SELECT COUNT(*), AVG(Discount) FROM {TABLE} WHERE SalesAmount > 500 AND Region = 'North'",
+}
+
+
+def generate_csv(path, rows, seed=7):
+    rng = random.Random(seed)
+    regions = ["North", "South", "East", "West", "Central"]
+    segments = ["Consumer", "Corporate", "Small Business"]
+    channels = ["Search", "Social", "Email", "Display", "Affiliate"]
+
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["OrderID", "OrderDate", "CustomerID", "ProductID", "Region", "CustomerSegment",
+                         "AdChannel", "AdSpend", "ConversionRate", "SalesAmount", "Discount"])
+        for order_id in range(rows):
+            writer.writerow([
+                order_id,
+                f"2023-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                rng.randint(1, 50000),
+                rng.randint(1, 2000),
+                rng.choice(regions),
+                rng.choice(segments),
+                rng.choice(channels),
+                round(rng.uniform(10, 5000), 2),
+                round(rng.random(), 4),
+                round(rng.uniform(5, 2000), 2),
+                round(rng.uniform(0, 0.3), 2),
+            ])
+
+
+def time_query(engine, sql, repeat):
+    conn = engine.connect()
+    best = float("inf")
+
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            conn.execute(sql).fetchall()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        conn.close()
+
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    project_path = tempfile.mkdtemp(prefix="insighter_bench_")
+    file_path = os.path.join(project_path, FILE_NAME)
+    file_paths = {FILE_NAME: file_path}
+
+    print(f"Generating {args.rows:,} rows in {project_path}")
+    generate_csv(file_path, args.rows)
+
+    start = time.perf_counter()
+    sync_project_db(project_path, file_paths)
+    print(f"SQLite ingestion: {time.perf_counter() - start:.2f} s")
+
+    engines = [("sqlite", get_engine("sqlite", project_path, file_paths))]
+    try:
+        import duckdb
+        parquet_path = os.path.join(project_path, "sales.parquet")
+        duckdb.execute(f"COPY (SELECT * FROM read_csv_auto('{file_path}')) TO '{parquet_path}' (FORMAT PARQUET)")
+        engines.append(("duckdb csv", get_engine("duckdb", project_path, file_paths)))
+        engines.append(("duckdb parquet", get_engine("duckdb", project_path, {FILE_NAME: parquet_path})))
+    except ImportError:
+        print("duckdb is not installed; only the SQLite engine is measured")
+
+    header = f"{'query':<36}" + "".join(f"{label:>16}" for label, _ in engines)
+    print(header)
+    print("-" * len(header))
+
+    for label, sql in QUERIES.items():
+        timings = [time_query(engine, sql, args.repeat) for _, engine in engines]
+        print(f"{label:<36}" + "".join(f"{timing * 1000:>14.1f}ms" for timing in timings))
+
+
+if __name__ == "__main__":
+    main()
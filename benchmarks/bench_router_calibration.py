@@ -0,0 +1,100 @@
+"""
+Precision of the local query router on held-out questions, per confidence threshold.
+
+The questions below are not in ROUTER_EXAMPLES. Each is classified by the
+keyword rules and the local model; for every candidate threshold the script
+reports how many questions skip the LLM router (coverage) and how many of
+those are routed correctly (precision). ROUTER_CONFIDENCE_THRESHOLD should sit
+at or a step above the lowest threshold that keeps precision at or above
+--target-precision.
+
+    python benchmarks/bench_router_calibration.py --target-precision 0.99
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from insighter.config.settings import ROUTER_CONFIDENCE_THRESHOLD
+from insighter.models.query_router import classify_query
+
+HELD_OUT = [
+    ("hello", "chat"),
+    ("thanks!", "chat"),
+    ("good morning", "chat"),
+    ("what is this dataset about?", "chat"),
+    ("what can i ask you", "chat"),
+    ("describe the data for me", "chat"),
+    ("what do you think is driving churn?", "chat"),
+    ("hi, what is the average order value", "sql database query"),
+    ("thanks, how many customers are there", "sql database query"),
+    ("sales by region", "sql database query"),
+    ("average discount per segment", "sql database query"),
+    ("how many returning customers are there", "sql database query"),
+    ("total ad spend in 2022", "sql database query"),
+    ("which product sold the most units", "sql database query"),
+    ("maximum order value per month", "sql database query"),
+    ("list the 5 cheapest products", "sql database query"),
+    ("median conversion rate by channel", "sql database query"),
+    ("number of orders per customer segment", "sql database query"),
+    ("revenue for the north region last year", "sql database query"),
+    ("what is the total profit", "sql database query"),
+    ("show me orders above 500", "sql database query"),
+    ("how many distinct products are there", "sql database query"),
+    ("show the insights i selected", "insight details"),
+    ("what query produced this insight", "insight details"),
+    ("tell me more about the first insight", "insight details"),
+    ("which insights could be charted", "insight details"),
+    ("give me details on these insights", "insight details"),
+    ("alert me when conversion rate drops", "alert"),
+    ("add an alert for low inventory", "alert"),
+    ("let me know if returns go above 10%", "alert"),
+    ("warn me if ad spend exceeds budget", "alert"),
+    ("plot revenue by channel", "visualization"),
+    ("show a pie chart of segments", "visualization"),
+    ("draw sales over the year", "visualization"),
+    ("visualize discount against sales", "visualization"),
+    ("make a histogram of order values", "visualization"),
+    ("compare the two insights", "comparison"),
+    ("how are these insights different", "comparison"),
+    ("contrast insight 1 with insight 3", "comparison"),
+    ("which of the selected insights is more important", "comparison"),
+]
+
+THRESHOLDS = [0.3, 0.4, 0.5, 0.55, 0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--target-precision", type=float, default=0.99)
+    args = parser.parse_args()
+
+    # Threshold 0 returns the model's best guess and confidence for every question
+    predictions = [(classify_query(question, threshold=0.0), expected, question) for question, expected in HELD_OUT]
+
+    print(f"{len(HELD_OUT)} held-out questions, current threshold {ROUTER_CONFIDENCE_THRESHOLD}\n")
+    print(f"{'threshold':<12}{'coverage':>10}{'precision':>12}{'correct':>12}")
+    print("-" * 46)
+
+    chosen = None
+
+    for threshold in THRESHOLDS:
+        routed = [(action, expected) for (action, confidence, _), expected, _ in predictions if action and confidence >= threshold]
+        correct = sum(action == expected for action, expected in routed)
+        precision = correct / len(routed) if routed else 1.0
+        print(f"{threshold:<12}{len(routed) / len(HELD_OUT):>10.0%}{precision:>12.0%}{f'{correct}/{len(routed)}':>12}")
+
+        if chosen is None and precision >= args.target_precision:
+            chosen = threshold
+
+    print("\nMisrouted at the current threshold:")
+    for (action, confidence, source), expected, question in predictions:
+        if action and action != expected and confidence >= ROUTER_CONFIDENCE_THRESHOLD:
+            print(f"  {question!r}: {action} via {source} ({confidence:.2f}), expected {expected}")
+
+    print(f"\nLowest threshold with precision >= {args.target_precision:.0%}: {chosen}")
+
+
+if __name__ == "__main__":
+    main()
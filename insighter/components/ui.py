@@ -1,4 +1,8 @@
+import os
+import json
 import streamlit as st
+from insighter.config.settings import JOB_POLL_SECONDS
+from insighter.utils.jobs import ACTIVE_STATUSES, get_project_jobs
 
 def render_header(title, subtitle=""):
     """Renders a consistent page header"""
@@ -17,4 +21,54 @@ def render_card(title="", content="", padding="1rem", margin="1rem", card_class=
         {content}
     </div>
     """
-    return html
\ No newline at end of file
+    return html
+
+def load_finished_insights(project, jobs):
+    """Load insights written by finished background jobs into the project"""
+    loaded_jobs = project.setdefault("loaded_jobs", set())
+
+    for file, job in jobs.items():
+
+        if job["status"] == "done" and file in project["files"] and job["id"] not in loaded_jobs:
+            json_path = project["file_paths"].get(file, "").replace('.csv', '.json')
+
+            if os.path.exists(json_path):
+                with open(json_path, 'r') as f:
+                    project["insights"][file] = json.load(f)
+
+            loaded_jobs.add(job["id"])
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def _poll_insight_jobs(project_name, project, file_name=None):
+    jobs = get_project_jobs(project_name)
+    active = False
+
+    for file, job in jobs.items():
+
+        if (file_name and file != file_name) or job["status"] not in ACTIVE_STATUSES:
+            continue
+
+        active = True
+        status = "Queued" if job["status"] == "queued" else f"Finished {(job['step'] or 'starting').replace('_', ' ')}"
+        st.progress(job["progress"] or 0.0, text=f"Generating insights for {file}: {status}")
+
+    if not active:
+        load_finished_insights(project, jobs)
+        st.rerun()
+
+def render_insight_jobs(project_name, project, file_name=None):
+    """Show background insight jobs for the project (or one file), refreshing while any is running"""
+    jobs = get_project_jobs(project_name)
+
+    if file_name:
+        jobs = {file: job for file, job in jobs.items() if file == file_name}
+
+    load_finished_insights(project, jobs)
+
+    if any(job["status"] in ACTIVE_STATUSES for job in jobs.values()):
+        _poll_insight_jobs(project_name, project, file_name)
+
+    for file, job in jobs.items():
+
+        if job["status"] == "failed" and project["insights"].get(file) is None:
+            st.error(f"Insight generation for {file} failed: {job['error']}")
@@ -13,6 +13,108 @@ DATABASE_PATH = os.path.join(DATA_DIR, "sales_marketing.db")
 # Projects directory
 PROJECTS_DIR = os.path.join(BASE_DIR, "projects")
 
+# Per-project ingested data store (lives inside each project directory)
+PROJECT_DB_NAME = "project.db"
+
+# Schema and LLM metadata cache, keyed by file fingerprint (per project)
+METADATA_CACHE_NAME = "metadata_cache.json"
+
+# Local query router: minimum classifier confidence before skipping the LLM router
+# Calibrated with benchmarks/bench_router_calibration.py: 0.5 routes 20 of 21 held-out questions correctly,
+# 0.55 and above route all of them; 0.6 keeps a step of margin (100% precision, 38% coverage)
+ROUTER_CONFIDENCE_THRESHOLD = 0.6
+
+# LLM response cache (shared by every chain)
+LLM_CACHE_ENABLED = True
+LLM_CACHE_PATH = os.path.join(PROJECTS_DIR, ".llm_cache.db")
+LLM_CACHE_MAX_BYTES = 50 * 1024 * 1024
+LLM_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# Rows per page returned to the UI by the chat SQL branch
+SQL_RESULT_PAGE_SIZE = 100
+
+# Sandboxed visualization workers
+VIZ_WORKERS = 2
+VIZ_TIMEOUT_SECONDS = 30
+VIZ_MEMORY_LIMIT_MB = 2048
+
+# DuckDB query engine worker threads (0 lets DuckDB use every core)
+DUCKDB_THREADS = 0
+
+# Index advisor for the SQLite project store
+INDEX_ADVISOR_ENABLED = True
+INDEX_ADVISOR_MIN_USES = 3
+INDEX_ADVISOR_MIN_SPEEDUP = 1.2
+INDEX_ADVISOR_TIMING_RUNS = 3
+# Re-evaluate a rejected index once its table has this many times the rows it had when rejected
+INDEX_ADVISOR_RETRY_GROWTH = 2.0
+# How long the advisor waits for another writer before giving up on an index build
+INDEX_ADVISOR_BUSY_TIMEOUT_SECONDS = 30
+
+# Time budgets for LLM-generated SQL, per pipeline (seconds, 0 disables)
+CHAT_QUERY_TIMEOUT_SECONDS = 15
+INSIGHT_QUERY_TIMEOUT_SECONDS = 30
+
+# Conversation context sent with each chat message
+CHAT_CONTEXT_TOKEN_BUDGET = 1000
+CHAT_CONTEXT_MAX_MESSAGE_TOKENS = 300
+CHAT_CONTEXT_PREVIEW_ROWS = 3
+
+# Token counting: tiktoken's cl100k_base encoding is kept here after a one-time background download;
+# until it is cached (or with INSIGHTER_TIKTOKEN_DOWNLOAD=0 offline) counts use a word/punctuation estimate
+TIKTOKEN_CACHE_DIR = os.path.join(PROJECTS_DIR, ".tiktoken")
+TIKTOKEN_DOWNLOAD = os.getenv("INSIGHTER_TIKTOKEN_DOWNLOAD", "1") == "1"
+
+# Selected insights retrieved into each chat prompt
+INSIGHT_RETRIEVAL_TOP_K = 5
+INSIGHT_CONTEXT_TOKEN_CEILING = 1500
+INSIGHT_RESULT_PREVIEW_ROWS = 5
+
+# Schema linking: only the tables/columns relevant to a chat question are sent to the agents
+SCHEMA_LINKING_ENABLED = True
+SCHEMA_LINKING_MIN_COLUMNS = 40
+SCHEMA_LINKING_MIN_CONFIDENCE = 0.3
+SCHEMA_LINKING_MAX_COLUMNS = 25
+
+# Insight SQL queries run concurrently, each on its own read-only connection
+INSIGHT_SQL_WORKERS = 4
+
+# Background insight generation jobs (queue shared by every project)
+JOBS_DB_PATH = os.path.join(PROJECTS_DIR, ".jobs.db")
+JOB_WORKERS = 2
+JOB_POLL_SECONDS = 2
+# A running job whose worker has not renewed its lease for this long is requeued
+JOB_LEASE_SECONDS = 60
+
+# Streaming CSV ingestion into the project store
+INGEST_CHUNK_ROWS = 50000
+INGEST_SAMPLE_ROWS = 10000
+
+# Compact column types: text columns with at most this share of distinct values become categoricals,
+# and Arrow-backed strings are used for the rest when pyarrow is installed and this is enabled
+INGEST_CATEGORY_RATIO = 0.5
+INGEST_ARROW_DTYPES = False
+
+# Per-project langgraph checkpoints of insight runs (resume after failures, skip unchanged files)
+INSIGHT_CHECKPOINT_DB_NAME = "insight_checkpoints.db"
+
+# Process-wide LLM gateway: provider limits, concurrent requests and 429 retries shared by every chain
+LLM_GATEWAY_REQUESTS_PER_MINUTE = 500
+LLM_GATEWAY_TOKENS_PER_MINUTE = 200000
+LLM_GATEWAY_MAX_CONCURRENCY = 8
+LLM_GATEWAY_MAX_RETRIES = 5
+LLM_GATEWAY_COMPLETION_TOKENS = 500
+LLM_HTTP_MAX_CONNECTIONS = 20
+
+# LLM backend behind the gateway: "live" calls OpenAI, "record" also saves every prompt/response to the cassette,
+# "replay" answers offline from the cassette, "fake" answers with scripted responses after a simulated latency
+LLM_BACKEND = os.getenv("INSIGHTER_LLM_BACKEND", "live")
+LLM_CASSETTE_PATH = os.getenv("INSIGHTER_LLM_CASSETTE", os.path.join(PROJECTS_DIR, ".llm_cassette.jsonl"))
+LLM_REPLAY_LATENCY_SCALE = float(os.getenv("INSIGHTER_LLM_REPLAY_LATENCY_SCALE", "1.0"))
+LLM_FAKE_LATENCY_MS = float(os.getenv("INSIGHTER_LLM_FAKE_LATENCY_MS", "800"))
+LLM_FAKE_LATENCY_JITTER = 0.25
+LLM_FAKE_SCRIPT = os.getenv("INSIGHTER_LLM_FAKE_SCRIPT")
+
 # Default configurations
 DEFAULT_APP_SETTINGS = {
     "theme": "light",
@@ -21,4 +123,4 @@ DEFAULT_APP_SETTINGS = {
 
 # Ensure directories exist
 os.makedirs(PROJECTS_DIR, exist_ok=True)
-os.makedirs(DATA_DIR, exist_ok=True) 
\ No newline at end of file
+os.makedirs(DATA_DIR, exist_ok=True) 
@@ -1,41 +1,89 @@
-from langchain_community.chat_models import ChatOpenAI
-from langchain.chains import LLMChain
-import os
-from insighter.utils.ai_client import get_client
-from insighter.models.chat_prompts import router_prompt, sql_agent_prompt, alert_agent_prompt, visualization_agent_prompt, comparison_agent_prompt, insight_details_agent_prompt, casual_chat_agent_prompt
-client = get_client()
-openai_api_key = client.api_key if hasattr(client, 'api_key') else os.getenv("OPENAI_API_KEY")
+import threading
+from insighter.utils.llm_cache import cached_invoke, cached_stream
+from insighter.utils.llm_gateway import get_chat_model
+from insighter.utils.llm_backends import uses_provider
+from insighter.utils.structured import structured_invoke
 
+_chains = {}
+_chains_lock = threading.Lock()
 
-llm = ChatOpenAI(temperature=0.9, model="gpt-3.5-turbo", openai_api_key=openai_api_key)
+# Prompt (in chat_prompts) behind each chain; chains and langchain itself are loaded on first use
+CHAIN_PROMPTS = {
+    "router": "router_prompt",
+    "sql": "sql_agent_prompt",
+    "alert": "alert_agent_prompt",
+    "visualization": "visualization_agent_prompt",
+    "comparison": "comparison_agent_prompt",
+    "insight_details": "insight_details_agent_prompt",
+    "casual_chat": "casual_chat_agent_prompt",
+    "json_repair": "json_repair_prompt",
+}
 
-router_chain = LLMChain(llm=llm, prompt=router_prompt)
-sql_chain = LLMChain(llm=llm, prompt=sql_agent_prompt)
-alert_chain = LLMChain(llm=llm, prompt=alert_agent_prompt)
-visualization_chain = LLMChain(llm=llm, prompt=visualization_agent_prompt)
-comparison_chain = LLMChain(llm=llm, prompt=comparison_agent_prompt)
-insight_details_chain = LLMChain(llm=llm, prompt=insight_details_agent_prompt)
-casual_chat_chain = LLMChain(llm=llm, prompt=casual_chat_agent_prompt)
+# Expected shape of the JSON-producing chains' output
+ROUTER_SCHEMA = {"action": ("sql database query", "alert", "visualization", "comparison", "insight details", "chat")}
+SQL_SCHEMA = {"sql_query": str}
+VISUALIZATION_SCHEMA = {"visualization_code": str}
 
 
 
-def route_query(user_query):
-    return router_chain.invoke({"user_query": user_query})
+def get_chain(name):
+    """LLMChain for one of CHAIN_PROMPTS, built on first use and named after it for the LLM backend; JSON repair runs at temperature 0"""
 
-def get_sql_query(user_query, columns):
-    return sql_chain.invoke({"user_query": user_query, "columns": columns})
+    key = (name, uses_provider())
 
-def get_alert(user_query, columns, insights):
-    return alert_chain.invoke({"user_query": user_query, "columns": columns, "insights": insights})
+    with _chains_lock:
+        if key not in _chains:
+            from langchain.chains import LLMChain
+            from insighter.models import chat_prompts
 
-def get_visualization(user_query, columns, csv_file, insights):
-    return visualization_chain.invoke({"user_query": user_query, "columns": columns, "csv_file": csv_file, "insights": insights})
+            temperature = 0 if name == "json_repair" else 0.9
+            _chains[key] = LLMChain(llm=get_chat_model(temperature=temperature), prompt=getattr(chat_prompts, CHAIN_PROMPTS[name]), name=name)
+
+    return _chains[key]
+
+def get_stream_chain(name):
+    """Token-streaming variant of a free-text chain, sharing its name"""
+    key = (name, "stream", uses_provider())
+
+    with _chains_lock:
+        if key not in _chains:
+            from langchain_core.output_parsers import StrOutputParser
+            from insighter.models import chat_prompts
+
+            chain = getattr(chat_prompts, CHAIN_PROMPTS[name]) | get_chat_model(temperature=0.9) | StrOutputParser()
+            chain.name = name
+            _chains[key] = chain
+
+    return _chains[key]
+
+
+
+def route_query(user_query, use_cache=True):
+    return structured_invoke(get_chain("router"), {"user_query": user_query}, ROUTER_SCHEMA, "router", get_chain("json_repair"), use_cache=use_cache)
+
+def get_sql_query(user_query, columns, use_cache=True):
+    return structured_invoke(get_chain("sql"), {"user_query": user_query, "columns": columns}, SQL_SCHEMA, "sql", get_chain("json_repair"), use_cache=use_cache)
+
+def get_alert(user_query, columns, insights, use_cache=True):
+    return cached_invoke(get_chain("alert"), {"user_query": user_query, "columns": columns, "insights": insights}, use_cache=use_cache)
+
+def get_visualization(user_query, columns, csv_file, insights, use_cache=True):
+    return structured_invoke(get_chain("visualization"), {"user_query": user_query, "columns": columns, "csv_file": csv_file, "insights": insights}, VISUALIZATION_SCHEMA, "visualization", get_chain("json_repair"), use_cache=use_cache)
  
-def get_compare_insights(user_query, insights):
-    return comparison_chain.invoke({"user_query": user_query, "insights": insights})
+def get_compare_insights(user_query, insights, use_cache=True):
+    return cached_invoke(get_chain("comparison"), {"user_query": user_query, "insights": insights}, use_cache=use_cache)
+
+def get_insight_details(user_query, metadata, insights, use_cache=True):
+    return cached_invoke(get_chain("insight_details"), {"user_query": user_query, "metadata": metadata, "insights": insights}, use_cache=use_cache) 
+
+def get_casual_chat(user_query, metadata, use_cache=True):
+    return cached_invoke(get_chain("casual_chat"), {"user_query": user_query, "metadata": metadata}, use_cache=use_cache)
+
+def stream_compare_insights(user_query, insights, use_cache=True):
+    return cached_stream(get_chain("comparison"), get_stream_chain("comparison"), {"user_query": user_query, "insights": insights}, use_cache=use_cache)
 
-def get_insight_details(user_query, metadata, insights):
-    return insight_details_chain.invoke({"user_query": user_query, "metadata": metadata, "insights": insights}) 
+def stream_insight_details(user_query, metadata, insights, use_cache=True):
+    return cached_stream(get_chain("insight_details"), get_stream_chain("insight_details"), {"user_query": user_query, "metadata": metadata, "insights": insights}, use_cache=use_cache)
 
-def get_casual_chat(user_query, metadata):
-    return casual_chat_chain.invoke({"user_query": user_query, "metadata": metadata})
\ No newline at end of file
+def stream_casual_chat(user_query, metadata, use_cache=True):
+    return cached_stream(get_chain("casual_chat"), get_stream_chain("casual_chat"), {"user_query": user_query, "metadata": metadata}, use_cache=use_cache)
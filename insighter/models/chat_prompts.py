@@ -234,3 +234,25 @@ casual_chat_agent_prompt = PromptTemplate(
 "Your response here".
 """
 )
+
+# =========================
+# JSON Repair Prompt
+# =========================
+
+json_repair_prompt = PromptTemplate(
+    input_variables=["output", "error", "format"],
+    template="""
+*** Role ***: You are a JSON repair tool.
+*** Task ***: The text in the *** Output *** section was meant to be a single JSON object following the *** Expected Format *** section, but it could not be used: {error}
+
+*** Output ***:
+{output}
+
+*** Expected Format ***:
+{format}
+
+*** Instructions ***:
+1. Return only the corrected JSON object, with no explanation and no code fences.
+2. Keep every value from the original output; fix only the structure, quoting and escaping, and fill in missing keys from the original content.
+"""
+)
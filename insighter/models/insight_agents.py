@@ -1,34 +1,50 @@
-from langchain_community.chat_models import ChatOpenAI
-from langchain.chains import LLMChain
-from insighter.models.insight_prompts import (
-    metadata_prompt,
-    insight_def_prompt,
-    text_to_sql_prompt,
-    insight_prompt
-)
-from dotenv import load_dotenv
-import os
+import threading
+from insighter.utils.llm_cache import cached_invoke
+from insighter.utils.structured import structured_invoke
+from insighter.utils.llm_gateway import get_chat_model
+from insighter.utils.llm_backends import uses_provider
+from insighter.models.chat_agents import get_chain as get_chat_chain
 
-load_dotenv()
+_chains = {}
+_chains_lock = threading.Lock()
 
-openai_api_key = os.getenv("OPENAI_API_KEY")
+# Prompt (in insight_prompts) behind each chain; built on first use
+CHAIN_PROMPTS = {
+    "metadata": "metadata_prompt",
+    "insight_def": "insight_def_prompt",
+    "text_to_sql": "text_to_sql_prompt",
+    "insight": "insight_prompt",
+}
 
-llm = ChatOpenAI(temperature=0.9, model="gpt-3.5-turbo", openai_api_key=openai_api_key)
+# Expected shape of the JSON-producing chains' output
+METADATA_SCHEMA = {"metadata": dict}
+SQL_QUERIES_SCHEMA = {"sql_queries": {"*": {"sql_query": str}}}
+INSIGHTS_SCHEMA = {"insights": dict}
 
-metadata_chain = LLMChain(llm=llm, prompt=metadata_prompt)
-insight_def_chain = LLMChain(llm=llm, prompt=insight_def_prompt)
-text_to_sql_chain = LLMChain(llm=llm, prompt=text_to_sql_prompt)
-insight_chain = LLMChain(llm=llm, prompt=insight_prompt)
 
+def get_chain(name):
+    """LLMChain for one of CHAIN_PROMPTS, built on first use and named after it for the LLM backend"""
 
-def get_metadata_result(columns):
-    return metadata_chain.invoke({"columns": columns})
+    key = (name, uses_provider())
 
-def get_insight_questions(metadata_result):
-    return insight_def_chain.invoke({"metadata": metadata_result})
+    with _chains_lock:
+        if key not in _chains:
+            from langchain.chains import LLMChain
+            from insighter.models import insight_prompts
 
-def get_sql_queries(metadata_result, insight_questions):
-    return text_to_sql_chain.invoke({"metadata": metadata_result, "insight_questions": insight_questions})
+            _chains[key] = LLMChain(llm=get_chat_model(temperature=0.9), prompt=getattr(insight_prompts, CHAIN_PROMPTS[name]), name=name)
 
-def insights_creation(sql_queries_and_results):
-    return insight_chain.invoke({"sql_queries_and_results": sql_queries_and_results})
+    return _chains[key]
+
+
+def get_metadata_result(columns, use_cache=True):
+    return structured_invoke(get_chain("metadata"), {"columns": columns}, METADATA_SCHEMA, "metadata", get_chat_chain("json_repair"), use_cache=use_cache)
+
+def get_insight_questions(metadata_result, use_cache=True):
+    return cached_invoke(get_chain("insight_def"), {"metadata": metadata_result}, use_cache=use_cache)
+
+def get_sql_queries(metadata_result, insight_questions, use_cache=True):
+    return structured_invoke(get_chain("text_to_sql"), {"metadata": metadata_result, "insight_questions": insight_questions}, SQL_QUERIES_SCHEMA, "insight_sql", get_chat_chain("json_repair"), use_cache=use_cache)
+
+def insights_creation(sql_queries_and_results, use_cache=True):
+    return structured_invoke(get_chain("insight"), {"sql_queries_and_results": sql_queries_and_results}, INSIGHTS_SCHEMA, "insight_presentation", get_chat_chain("json_repair"), use_cache=use_cache)
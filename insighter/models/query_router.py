@@ -0,0 +1,141 @@
+import re
+import threading
+from collections import Counter
+
+# =========================
+# High-precision keyword rules
+# =========================
+
+ROUTER_RULES = [
+    ("alert", re.compile(r"\b(create|set up|setup|add|make)\s+(an?\s+)?alerts?\b|\bnotify me\b|\balert me\b")),
+    ("comparison", re.compile(r"\bcompar(e|ing|ison)\b.*\binsights?\b|\binsights?\b.*\bcompar(e|ing|ison)\b|\bdifferences? between\b.*\binsights?\b")),
+    ("insight details", re.compile(r"\binsights?\b.*\b(visuali[sz]able|plot+able|sql|query used|more details|explain|context)\b|\b(list|which|what) (are )?(the |my )?(selected )?insights\b")),
+    ("visualization", re.compile(r"\b(plot|chart|graph|visuali[sz]e|histogram|bar chart|pie chart|line chart|scatter ?plot|heatmap)\b")),
+    ("chat", re.compile(r"^\s*(hi|hello|hey|thanks|thank you|thanks a lot|good (morning|afternoon|evening)|how are you( doing)?)( there)?[\s!.,?]*$")),
+]
+
+# =========================
+# Seed examples for the local classifier
+# =========================
+
+ROUTER_EXAMPLES = [
+    ("how are you?", "chat"),
+    ("what kind of data do you have?", "chat"),
+    ("what kind of insights can be generated from the data?", "chat"),
+    ("any patterns or trends in the data?", "chat"),
+    ("tell me about this dataset", "chat"),
+    ("what does this data contain", "chat"),
+    ("why do you think sales dropped?", "chat"),
+    ("what can you do", "chat"),
+    ("what insights do you have?", "insight details"),
+    ("can you provide more details about the insights?", "insight details"),
+    ("can you list the insights that can be visualized?", "insight details"),
+    ("which of these insights are visualizable", "insight details"),
+    ("what sql query was used to generate this insight", "insight details"),
+    ("explain the selected insight", "insight details"),
+    ("give me the context behind this insight", "insight details"),
+    ("average sales", "sql database query"),
+    ("sales per region", "sql database query"),
+    ("highest marketing cost", "sql database query"),
+    ("total revenue by month", "sql database query"),
+    ("how many orders were placed in 2023", "sql database query"),
+    ("top 10 customers by spend", "sql database query"),
+    ("count of products per category", "sql database query"),
+    ("show me the minimum price for each product", "sql database query"),
+    ("which region has the lowest profit", "sql database query"),
+    ("sum of quantity sold last quarter", "sql database query"),
+    ("create an alert if sales drop below 1000", "alert"),
+    ("notify me when revenue falls", "alert"),
+    ("alert me if customer complaints exceed 5%", "alert"),
+    ("set up an alert for monthly revenue targets", "alert"),
+    ("warn me when inventory is below threshold", "alert"),
+    ("show a chart of sales over time", "visualization"),
+    ("visualize the trends", "visualization"),
+    ("create a graph of revenue by region", "visualization"),
+    ("visualize this insight", "visualization"),
+    ("plot average sales by month", "visualization"),
+    ("draw a bar chart of orders per category", "visualization"),
+    ("compare these insights", "comparison"),
+    ("what is the difference between these insights", "comparison"),
+    ("compare the insights", "comparison"),
+    ("how do the selected insights differ", "comparison"),
+    ("contrast the first and second insight", "comparison"),
+]
+
+router_stats = Counter()
+_model = None
+_model_lock = threading.Lock()
+
+
+def extract_current_question(user_query):
+    """Drop the conversation context the chat page prepends to the query"""
+    marker = "Current question:"
+    if marker in user_query:
+        return user_query.rsplit(marker, 1)[1].strip()
+    return user_query.strip()
+
+
+def _get_model():
+    global _model
+
+    with _model_lock:
+        if _model is None:
+            try:
+                from sklearn.feature_extraction.text import TfidfVectorizer
+                from sklearn.linear_model import LogisticRegression
+                from sklearn.pipeline import make_pipeline
+            except ImportError:
+                print("scikit-learn is not installed; local router falls back to keyword rules only")
+                _model = False
+                return _model
+
+            texts, labels = zip(*ROUTER_EXAMPLES)
+            _model = make_pipeline(
+                TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True),
+                LogisticRegression(C=10.0, max_iter=1000)
+            )
+            _model.fit(texts, labels)
+
+    return _model
+
+
+def classify_query(user_query, threshold=None):
+    """Classify locally; returns (action, confidence, source) with action None when unsure"""
+    if threshold is None:
+        from insighter.config.settings import ROUTER_CONFIDENCE_THRESHOLD
+        threshold = ROUTER_CONFIDENCE_THRESHOLD
+
+    question = extract_current_question(user_query).lower()
+
+    for action, pattern in ROUTER_RULES:
+        if pattern.search(question):
+            router_stats["rule"] += 1
+            return action, 1.0, "rule"
+
+    model = _get_model()
+
+    if model:
+        probabilities = model.predict_proba([question])[0]
+        best = probabilities.argmax()
+        confidence = float(probabilities[best])
+
+        if confidence >= threshold:
+            router_stats["model"] += 1
+            return model.classes_[best], confidence, "model"
+
+    router_stats["llm"] += 1
+    return None, 0.0, "llm"
+
+
+def get_router_stats():
+
+    total = sum(router_stats.values())
+    fast_path = router_stats["rule"] + router_stats["model"]
+
+    return {
+        "rule": router_stats["rule"],
+        "model": router_stats["model"],
+        "llm": router_stats["llm"],
+        "total": total,
+        "fast_path_rate": fast_path / total if total else 0.0
+    }
@@ -3,9 +3,9 @@ import json
 import time
 import pandas as pd
 import streamlit as st
-from insighter.components.ui import render_header, render_card
+from insighter.components.ui import render_header, render_card, render_insight_jobs
 from insighter.utils.state import navigate_to, toggle_details
-from insighter.utils.insights import run_insight_pipeline
+from insighter.utils.jobs import enqueue_insight_job
 
 def render_file_insights():
     current_project = st.session_state.current_project
@@ -49,18 +49,10 @@ def render_file_insights():
 
             with center:
                 if st.button("Generate Insights", key=f"generate_insights_btn_{current_file}", type="primary", use_container_width=True):
+                    enqueue_insight_job(current_project, current_file, csv_path, engine=project.get("engine", "sqlite"))
+                    st.rerun()
 
-                    with st.spinner("Generating insights... This may take a few minutes."):
-
-                        try:
-                            insights_data = run_insight_pipeline(csv_path)
-                            project["insights"][current_file] = insights_data
-                            st.success("Insights generated successfully!")
-                            st.rerun()
-
-                        except Exception as e:
-                            st.error(f"Error generating insights: {str(e)}")
-                            st.info(f"Make sure the file exists and is properly formatted. Path: {csv_path}")
+            render_insight_jobs(current_project, project, current_file)
     
 
     if insights_data:
@@ -3,6 +3,24 @@ import pandas as pd
 import streamlit as st
 from insighter.components.ui import render_header
 from insighter.utils.state import navigate_to
+from insighter.utils.dtypes import compact_dataframe, memory_mb
+
+def summarize_file(file_path):
+    """Load a CSV with compact types and compute the statistics shown on the file page"""
+    df = pd.read_csv(file_path)
+    memory_before = memory_mb(df)
+    df = compact_dataframe(df)
+    memory_after = memory_mb(df)
+
+    col_info = pd.DataFrame({
+        'Column': df.columns,
+        'Type': df.dtypes.astype(str),
+        'Non-Null Count': df.count(),
+        'Null Count': df.isna().sum(),
+        'Unique Values': [df[col].nunique() for col in df.columns]
+    })
+
+    return {"df": df, "memory_before": memory_before, "memory_after": memory_after, "col_info": col_info}
 
 def render_file_view():
 
@@ -22,30 +40,24 @@ def render_file_view():
     with st.spinner("Loading file..."):
 
         try:
-            df = pd.read_csv(file_path)
+            summary = summarize_file(file_path)
+            df, memory_before, memory_after = summary["df"], summary["memory_before"], summary["memory_after"]
             
             st.markdown("## Data Summary")
-            metrics = st.columns(3)
+            metrics = st.columns(4)
             metrics[0].metric("Rows", f"{len(df):,}")
             metrics[1].metric("Columns", len(df.columns))
             
             file_size = os.path.getsize(file_path)
             size_str = f"{file_size/1024:.1f} KB" if file_size < 1024*1024 else f"{file_size/(1024*1024):.1f} MB"
             metrics[2].metric("File Size", size_str)
+            metrics[3].metric("Memory", f"{memory_after:.1f} MB", delta=f"{memory_after - memory_before:.1f} MB vs default types", delta_color="inverse")
             
             st.markdown("## Data Preview")
             st.dataframe(df, use_container_width=True)
             
             st.markdown("## Column Information")
-            col_info = pd.DataFrame({
-                'Column': df.columns,
-                'Type': df.dtypes.astype(str),
-                'Non-Null Count': df.count(),
-                'Null Count': df.isna().sum(),
-                'Unique Values': [df[col].nunique() for col in df.columns]
-            })
-
-            st.dataframe(col_info, use_container_width=True)
+            st.dataframe(summary["col_info"], use_container_width=True)
         
             st.markdown("### Column Types")
             cols = st.columns(3)
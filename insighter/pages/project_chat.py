@@ -3,18 +3,50 @@ import time
 import os
 import json
 import pandas as pd
-from insighter.components.ui import render_header
+from insighter.components.ui import render_header, render_insight_jobs
 from insighter.utils.state import navigate_to
-from insighter.utils.ai_client import get_client
-from insighter.pipelines.chat import process_chat_query
-from insighter.utils.project import delete_project, delete_file
-from insighter.utils.insights import run_insight_pipeline
+from insighter.models.query_router import get_router_stats
+from insighter.utils.structured import get_structured_stats
+from insighter.utils.llm_gateway import get_gateway_stats
+from insighter.utils.viz_sandbox import get_visualization_pool
+from insighter.utils.engines import ENGINES
+from insighter.utils.database import get_project_db_path
+from insighter.utils.index_advisor import get_index_report
+from insighter.utils.conversation import build_conversation_context
+from insighter.utils.project import delete_project, delete_file, add_file
+from insighter.utils.jobs import enqueue_insight_job
+
+def render_sql_result(sql_result, project, key):
+    """Render a paged SQL result with a button to fetch the next page on demand"""
+    rows = sql_result.get("rows", [])
+    total_rows = sql_result.get("total_rows")
+
+    st.dataframe(pd.DataFrame(rows, columns=sql_result.get("columns", [])), use_container_width=True)
+
+    total_text = f"{total_rows:,}" if total_rows is not None else "more"
+    st.caption(f"Showing {len(rows):,} of {total_text} rows")
+
+    if sql_result.get("truncated") and st.button("Load more rows", key=key):
+        from insighter.pipelines.chat import fetch_sql_page
+
+        next_page = fetch_sql_page(
+            project["path"], sql_result["sql_query"], offset=len(rows),
+            engine=project.get("engine", "sqlite"), file_paths=project.get("file_paths", {})
+        )
+
+        if next_page.get("error"):
+            st.error(f"Error loading more rows: {next_page['error']}")
+
+        else:
+            sql_result["rows"] = rows + next_page["rows"]
+            sql_result["truncated"] = next_page["truncated"]
+            st.rerun()
 
 def render_project_chat():
     """Render the project chat page with enhanced capabilities and dashboard functionality"""
     current_project = st.session_state.current_project
     project = st.session_state.projects[current_project]
-    client = get_client()
+    get_visualization_pool()
     
     if "file_paths" not in project:
         project["file_paths"] = {}
@@ -80,25 +112,17 @@ def render_project_chat():
         file_to_analyze = st.session_state.generate_insights_for
 
         if file_to_analyze in project["files"] and (project["insights"].get(file_to_analyze) is None):
+            csv_path = project["file_paths"].get(file_to_analyze)
 
-            with st.spinner(f"Generating insights for {file_to_analyze}... This may take a few minutes."):
-
-                try:
-                    
-                    csv_path = project["file_paths"].get(file_to_analyze)
+            if csv_path and os.path.exists(csv_path):
+                enqueue_insight_job(current_project, file_to_analyze, csv_path, engine=project.get("engine", "sqlite"))
 
-                    if csv_path and os.path.exists(csv_path):
-                        insights_data = run_insight_pipeline(csv_path)
-                        project["insights"][file_to_analyze] = insights_data
-                        st.success("Insights generated successfully!")
-
-                    else:
-                        st.error(f"File not found: {csv_path}")
-
-                except Exception as e:
-                    st.error(f"Error generating insights: {str(e)}")
+            else:
+                st.error(f"File not found: {csv_path}")
         
         st.session_state.generate_insights_for = None
+
+    render_insight_jobs(current_project, project)
     
     with chat_tab:
         chat_container = st.container()
@@ -107,7 +131,7 @@ def render_project_chat():
             
             if project["messages"]:
                 
-                for message in project["messages"]:
+                for message_index, message in enumerate(project["messages"]):
                     role = message["role"]
                     content = message["content"]
                     
@@ -119,7 +143,13 @@ def render_project_chat():
 
                         with st.chat_message("assistant", avatar="🤖"):
 
-                            if content.endswith('.png') and os.path.exists(content):
+                            if message.get("sql_result"):
+                                render_sql_result(message["sql_result"], project, f"sql_more_{current_project}_{message_index}")
+
+                            elif message.get("image"):
+                                st.image(message["image"])
+
+                            elif content.endswith('.png') and os.path.exists(content):
                                 st.image(content)
 
                             else:
@@ -144,15 +174,9 @@ def render_project_chat():
                 with st.spinner("Processing uploads..."):
 
                     for file in uploaded_files:
-                        file_path = os.path.join(project["path"], file.name)
 
                         if file.name not in project["files"]:
-
-                            with open(file_path, "wb") as f:
-                                f.write(file.getbuffer())
-                            project["files"].append(file.name)
-                            project["file_paths"][file.name] = file_path
-                            project["insights"][file.name] = None
+                            add_file(current_project, file.name, file.getbuffer())
                             st.success(f"Uploaded {file.name}")
 
                         else:
@@ -179,33 +203,15 @@ def render_project_chat():
                 with gen_insights_btn:
 
                     if st.button("Generate Insights", key=f"gen_insight_{file}_{current_project}", use_container_width=True):
+                        csv_path = project["file_paths"].get(file)
 
-                        with st.spinner(f"Generating insights for {file}... This may take a few minutes."):
-
-                            try:
-
-                                csv_path = project["file_paths"].get(file)
-                                
-                                if csv_path and os.path.exists(csv_path):
-                                    insights_data = run_insight_pipeline(csv_path)
-                                    project["insights"][file] = insights_data
-                                    
-                                    json_path = csv_path.replace('.csv', '.json')
-
-                                    with open(json_path, 'w') as f:
-                                        json.dump(insights_data, f)
-                                        
-                                    st.success("Insights generated successfully!")
-                                    st.session_state.active_tab = "All Insights"
-
-                                    st.rerun()
+                        if csv_path and os.path.exists(csv_path):
+                            enqueue_insight_job(current_project, file, csv_path, engine=project.get("engine", "sqlite"))
+                            st.session_state.active_tab = "All Insights"
+                            st.rerun()
 
-                                else:
-                                    st.error(f"File not found: {csv_path}")
-                                    
-                            except Exception as e:
-                                st.error(f"Error generating insights: {str(e)}")
-                                st.info(f"Make sure the file exists and is properly formatted.")
+                        else:
+                            st.error(f"File not found: {csv_path}")
                 
                 with delete_btn:
 
@@ -390,11 +396,56 @@ def render_project_chat():
         )
         project["model"] = model_choice
 
+        engine_options = list(ENGINES)
+        engine_choice = st.selectbox(
+            "Query engine",
+            engine_options,
+            index=engine_options.index(project.get("engine", "sqlite")),
+            help="sqlite queries the ingested project store; duckdb queries the CSV/Parquet files directly with a multi-threaded engine",
+            key=f"engine_select_{current_project}"
+        )
+        project["engine"] = engine_choice
+
         temperature = st.slider("Temperature", 0.0, 1.0, 0.7, 0.1, 
                              help="Higher values make output more random, lower values more deterministic",
                              key=f"temp_slider_{current_project}")
         project["temperature"] = temperature
         
+        router_stats = get_router_stats()
+
+        if router_stats["total"]:
+            st.caption(
+                f"Query routing: {router_stats['rule'] + router_stats['model']} of {router_stats['total']} "
+                f"messages routed locally ({router_stats['fast_path_rate']:.0%}), {router_stats['llm']} sent to the LLM router"
+            )
+
+        structured_stats = get_structured_stats()
+
+        if structured_stats["total"]:
+            st.caption(
+                f"Structured LLM outputs: {structured_stats['total']} parsed, {structured_stats.get('repaired_locally', 0)} repaired locally, "
+                f"{structured_stats.get('repaired_by_llm', 0)} repaired by a retry, {structured_stats.get('failed', 0)} unusable"
+            )
+
+        gateway_stats = get_gateway_stats()
+
+        if gateway_stats.get("requests"):
+            st.caption(
+                f"LLM gateway: {gateway_stats['requests']} provider requests, {gateway_stats.get('coalesced', 0)} shared with an identical "
+                f"in-flight request, {gateway_stats.get('rate_limited', 0)} rate limited, {gateway_stats.get('waited_seconds', 0):.1f}s spent queued"
+            )
+        
+        if project["engine"] == "sqlite" and os.path.exists(get_project_db_path(project["path"])):
+
+            with st.expander("Index advisor", expanded=False):
+                index_report = get_index_report(project["path"])
+
+                if index_report:
+                    st.markdown("Indexes the advisor tried on the project store, with the measured speedup on the queries that use them:")
+                    st.dataframe(pd.DataFrame(index_report), use_container_width=True)
+                else:
+                    st.info("No indexes have been evaluated yet. They are suggested as you run queries.")
+        
         if project["messages"] and st.button("Clear Chat History", key=f"clear_chat_{current_project}"):
             project["messages"] = []
             st.rerun()
@@ -446,19 +497,9 @@ def render_project_chat():
                 try:
                     user_query = project["messages"][-1]["content"]
 
-                    last_conversations = []
-
-                    for msg in reversed(project["messages"][:-1]): 
-
-                        if msg["role"] in ["user", "assistant"]:
-
-                            last_conversations.append(f"{msg['role'].title()}: {msg['content']}")
-
-                            if len(last_conversations) >= 4: 
-                                break
+                    conversation_context, context_tokens = build_conversation_context(project["messages"][:-1])
                     
-                    if last_conversations:
-                        conversation_context = "\n".join(reversed(last_conversations))
+                    if conversation_context:
                         user_query = f"Previous conversation:\n{conversation_context}\n\nCurrent question: {user_query}"
                     
                     all_insights = {}
@@ -476,17 +517,49 @@ def render_project_chat():
                                 "selection_order": i
                             }
                             
-                    response = process_chat_query(
+                    from insighter.pipelines.chat import stream_chat_query
+
+                    final_state, chunks = stream_chat_query(
                         user_query=user_query,
-                        selected_insights=all_insights
+                        selected_insights=all_insights,
+                        project_name=current_project
                     )
-                    
-                    if response.endswith('.png') and os.path.exists(response):
-                        st.image(response)
+
+                    sql_result = final_state.get("sql_result")
+                    image = final_state.get("image")
+
+                    if chunks is not None:
+                        response = st.write_stream(chunks)
+
                     else:
-                        st.write(response)
+                        response = final_state.get("agent_response") or "Sorry, I couldn't process that request."
+
+                        if sql_result:
+                            st.dataframe(pd.DataFrame(sql_result["rows"], columns=sql_result["columns"]), use_container_width=True)
+                        elif image:
+                            st.image(image)
+                        elif response.endswith('.png') and os.path.exists(response):
+                            st.image(response)
+                        else:
+                            st.write(response)
                     
-                    project["messages"].append({"role": "assistant", "content": response})
+                    prompt_tokens = final_state.get("prompt_tokens") or 0
+                    st.caption(f"Prompt: ~{prompt_tokens:,} tokens ({context_tokens:,} of conversation context)")
+
+                    assistant_message = {
+                        "role": "assistant",
+                        "content": response,
+                        "prompt_tokens": prompt_tokens,
+                        "context_tokens": context_tokens
+                    }
+
+                    if sql_result and not sql_result.get("error"):
+                        assistant_message["sql_result"] = sql_result
+
+                    if image:
+                        assistant_message["image"] = image
+
+                    project["messages"].append(assistant_message)
                     
                 except Exception as e:
 
@@ -1,4 +1,10 @@
-from . import insights
-from . import chat
+import importlib
 
 __all__ = ["insights", "chat"]
+
+
+def __getattr__(name):
+    # Submodules pull in langchain/langgraph, so they are only imported when first accessed
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,16 +1,32 @@
-import sqlite3
+import os
 import pandas as pd
 import json
+import threading
 import streamlit as st
-import matplotlib.pyplot as plt
-from typing import TypedDict, Optional, Any
+from typing import TypedDict, Optional, Any, Iterator, Tuple
 from langgraph.graph import StateGraph, END
+from insighter.config.settings import CHAT_QUERY_TIMEOUT_SECONDS, SQL_RESULT_PAGE_SIZE, SCHEMA_LINKING_ENABLED, SCHEMA_LINKING_MIN_COLUMNS
 from insighter.utils.project import create_custom_alert
+from insighter.utils.database import file_fingerprint, sync_project_db, table_name_for
+from insighter.utils.engines import QueryTimeoutError, get_engine, query_deadline, to_json_row
+from insighter.utils.index_advisor import record_and_advise
+from insighter.utils.viz_sandbox import VisualizationError, render_visualization
+from insighter.utils.conversation import count_tokens
+from insighter.utils.retrieval import select_relevant_insights
+from insighter.utils.schema_linking import get_value_samples, link_schema
+from insighter.utils.structured import StructuredOutputError
+from insighter.utils.metadata_cache import load_metadata_cache, get_cached_metadata, set_cached_metadata
 from insighter.models.chat_agents import route_query, get_sql_query, get_alert, get_visualization, get_compare_insights, get_insight_details, get_casual_chat
+from insighter.models.query_router import classify_query, extract_current_question
+from insighter.models.chat_agents import stream_compare_insights, stream_insight_details, stream_casual_chat
     
 
 class WorkflowState(TypedDict):
     user_query: str
+    project_name: Optional[str]
+    project_path: Optional[str]
+    file_paths: Optional[dict]
+    engine: Optional[str]
     columns: str
     insights: str
     router_response: Optional[str]
@@ -18,43 +34,23 @@ class WorkflowState(TypedDict):
     agent_response: Optional[str]
     db_connection: Optional[Any]
     metadata_result: Optional[str]
-
-
-
-def extract_field_from_response(response: Any, field: str) -> str:
-    if isinstance(response, dict):
-        text = response.get("text", "")
-    else:
-        text = str(response)
-    try:
-        text = text.replace('\n\n', ' ').replace('\n', ' ')
-        data = json.loads(text)
-
-    except json.JSONDecodeError as e:
-        print(f"Error decoding JSON for field '{field}': {e}")
-        print(f"Received text: {text}")
-        return ""
-    return data.get(field, "")
+    sql_result: Optional[dict]
+    image: Optional[bytes]
+    prompt_tokens: Optional[int]
 
 
 
 def load_csv_to_sql_node(state: WorkflowState) -> WorkflowState:
     print("in load_csv_to_sql_node")
-    current_project = st.session_state.current_project
-    project = st.session_state.projects[current_project]
-    conn = sqlite3.connect(":memory:")
-    
-    for file_name in project.get("files", []):
-        file_path = project.get("file_paths", {}).get(file_name)
-        if file_path and file_path.endswith('.csv'):
-            try:
-                df = pd.read_csv(file_path)
-                table_name = file_name.replace('.', '_').replace(' ', '_')
-                df.to_sql(table_name, conn, if_exists="replace", index=False)
-            except Exception as e:
-                print(f"Error loading {file_name}: {e}")
-    
-    state["db_connection"] = conn
+    project_path = state["project_path"]
+    file_paths = state.get("file_paths") or {}
+    engine = get_engine(state.get("engine") or "sqlite", project_path, file_paths)
+
+    if engine.name == "sqlite":
+        sync_project_db(project_path, file_paths)
+
+    if engine.is_available():
+        state["db_connection"] = engine.connect()
     return state
 
 
@@ -65,19 +61,56 @@ def extract_metadata_node(state: WorkflowState) -> WorkflowState:
     if not conn:
         return state
     
-    tables = conn.execute("SELECT name FROM sqlite_master WHERE type='table';").fetchall()
+    project_path = state["project_path"]
+    file_paths = state.get("file_paths") or {}
+    engine = get_engine(state.get("engine") or "sqlite", project_path, file_paths)
+    tables = engine.list_tables(conn)
     print(f"Tables: {tables}")
     metadata = {}
+
+    files_by_table = {table_name_for(file_name): file_name for file_name in file_paths}
+    fingerprints = {}
+    schema_key = f"schema:{engine.name}"
+    cache = load_metadata_cache(project_path)
     
-    for table in tables:
-        table_name = table[0]
-        columns_info = conn.execute(f"PRAGMA table_info({table_name})").fetchall()
-        metadata[table_name] = columns_info
+    for table_name in tables:
+        file_name = files_by_table.get(table_name)
+        file_path = file_paths.get(file_name) if file_name else None
+        fingerprint = file_fingerprint(file_path) if file_path and os.path.exists(file_path) else None
+        fingerprints[table_name] = fingerprint
+        columns_info = get_cached_metadata(project_path, file_name, fingerprint, schema_key, cache) if fingerprint else None
+
+        if columns_info is None:
+            columns_info = engine.table_info(conn, table_name)
+            if fingerprint:
+                set_cached_metadata(project_path, file_name, fingerprint, schema_key, columns_info)
+
+        metadata[table_name] = [tuple(column) for column in columns_info]
         print(f"Table: {table_name}")
     
     
     state["columns"] = json.dumps(metadata)
-    state["metadata_result"] = f"Tables: {[t[0] for t in tables]}\nColumns: {metadata}"
+    state["metadata_result"] = f"SQL dialect: {engine.dialect}\nTables: {tables}\nColumns: {metadata}"
+
+    total_columns = sum(len(columns) for columns in metadata.values())
+
+    if SCHEMA_LINKING_ENABLED and total_columns > SCHEMA_LINKING_MIN_COLUMNS:
+        value_samples = {
+            table_name: get_value_samples(engine, conn, table_name, columns, project_path, files_by_table.get(table_name), fingerprints[table_name], cache)
+            for table_name, columns in metadata.items()
+        }
+        linked = link_schema(extract_current_question(state["user_query"]), metadata, value_samples)
+
+        if linked:
+            linked_metadata, matched_values, confidence = linked
+            print(f"Schema linking kept {len(linked_metadata)}/{len(metadata)} tables (confidence {confidence:.2f})")
+            state["metadata_result"] = (
+                f"SQL dialect: {engine.dialect}\nTables: {list(linked_metadata)}\nColumns: {linked_metadata}"
+                + (f"\nValues mentioned in the question: {matched_values}" if matched_values else "")
+            )
+        else:
+            print("Schema linking confidence too low, using the full schema")
+
     return state
 
 
@@ -85,10 +118,22 @@ def extract_metadata_node(state: WorkflowState) -> WorkflowState:
 def route_query_node(state: WorkflowState) -> WorkflowState:
     print("in route_query_node")
     user_query = state["user_query"]
-    router_response = route_query(user_query)
-    state["router_response"] = str(router_response)
-    action = extract_field_from_response(router_response, "action").lower().strip()
-    state["action"] = action
+    action, confidence, source = classify_query(user_query)
+
+    if action:
+        print(f"Routed locally via {source} ({confidence:.2f}): {action}")
+        state["router_response"] = json.dumps({"action": action})
+        state["action"] = action
+        return state
+
+    try:
+        router_response = route_query(user_query)
+    except StructuredOutputError as e:
+        print(e)
+        router_response = {"action": ""}
+
+    state["router_response"] = json.dumps(router_response)
+    state["action"] = str(router_response.get("action", "")).lower().strip()
     return state
 
 
@@ -97,8 +142,12 @@ def sql_node(state: WorkflowState) -> WorkflowState:
     print("in sql_node")
     columns = state.get("metadata_result", "")
     user_query = state["user_query"]
-    sql_response = get_sql_query(user_query, columns)
-    sql_query = extract_field_from_response(sql_response, "sql_query")
+    try:
+        sql_query = get_sql_query(user_query, columns)["sql_query"]
+    except StructuredOutputError as e:
+        print(e)
+        sql_query = ""
+
     state["agent_response"] = sql_query
     return state
 
@@ -125,16 +174,19 @@ def visualization_node(state: WorkflowState) -> WorkflowState:
     columns = state.get("metadata_result", "")
     user_query = state["user_query"]
     insights = state.get("insights", "")
-    current_project = st.session_state.current_project
+    file_paths = state.get("file_paths") or {}
 
-    project = st.session_state.projects[current_project]
-    csv_files = [f for f in project.get("files", []) if f.endswith('.csv')]
+    csv_files = [f for f in file_paths if f.endswith('.csv')]
     csv_file = ""
     if csv_files:
-        csv_file = project.get("file_paths", {}).get(csv_files[0], "")
+        csv_file = os.path.abspath(file_paths.get(csv_files[0], ""))
     
-    viz_response = get_visualization(user_query, columns, csv_file, insights)
-    viz_text = extract_field_from_response(viz_response, "visualization_code")
+    try:
+        viz_text = get_visualization(user_query, columns, csv_file, insights)["visualization_code"]
+    except StructuredOutputError as e:
+        print(e)
+        viz_text = ""
+
     print(f"Visualization Code: {viz_text}")
     state["agent_response"] = viz_text
     return state
@@ -184,31 +236,95 @@ def casual_chat_node(state: WorkflowState) -> WorkflowState:
 
 
 
-def execute_sql_query(db_conn: sqlite3.Connection, sql_query: str) -> pd.DataFrame:
+def execute_sql_query(db_conn: Any, sql_query: str, offset: int = 0, limit: int = None, timeout: float = None) -> dict:
+    """Run a query within the chat time budget and return one page of rows plus columns, total row count and a truncated flag"""
+    if limit is None:
+        limit = SQL_RESULT_PAGE_SIZE
+    if timeout is None:
+        timeout = CHAT_QUERY_TIMEOUT_SECONDS
+
     try:
         cursor = db_conn.cursor()
-        cursor.execute(sql_query)
-        rows = cursor.fetchall()
-        columns = [desc[0] for desc in cursor.description]
-        df = pd.DataFrame(rows, columns=columns)
-        return df
+
+        with query_deadline(cursor, timeout):
+            cursor.execute(sql_query)
+            columns = [desc[0] for desc in cursor.description] if cursor.description else []
+
+            skipped = 0
+            while skipped < offset:
+                batch = cursor.fetchmany(min(offset - skipped, 10000))
+                if not batch:
+                    break
+                skipped += len(batch)
+
+            rows = [to_json_row(row) for row in cursor.fetchmany(limit)]
+            truncated = cursor.fetchone() is not None
+
+            total_rows = offset + len(rows)
+            if truncated:
+                total_rows = count_sql_rows(cursor, sql_query)
+
+        cursor.close()
+
+        return {
+            "sql_query": sql_query,
+            "columns": columns,
+            "rows": rows,
+            "offset": offset,
+            "total_rows": total_rows,
+            "truncated": truncated
+        }
+    except QueryTimeoutError as e:
+        print(f"SQL query timed out: {e}")
+        return {"sql_query": sql_query, "columns": [], "rows": [], "offset": offset, "total_rows": 0, "truncated": False, "error": str(e), "timed_out": True}
     except Exception as e:
         print(f"Error executing SQL query: {e}")
-        return pd.DataFrame()
+        return {"sql_query": sql_query, "columns": [], "rows": [], "offset": offset, "total_rows": 0, "truncated": False, "error": str(e)}
 
 
 
-def execute_visualization_code(viz_code: str) -> str:
+def count_sql_rows(cursor: Any, sql_query: str) -> Optional[int]:
     try:
-        import time
-        plot_name = f"plot_{int(time.time())}.png"
-        viz_code = viz_code.replace('plot.png', plot_name)
-        
-        exec(viz_code, globals())
-        return plot_name
+        inner_query = sql_query.strip().rstrip(";")
+        return cursor.execute(f"SELECT COUNT(*) FROM ({inner_query})").fetchone()[0]
     except Exception as e:
-        print("Error executing visualization code:", e)
-        return f"Error: {str(e)}"
+        print(f"Error counting SQL result rows: {e}")
+        return None
+
+
+
+def fetch_sql_page(project_path: str, sql_query: str, offset: int, limit: int = None, engine: str = "sqlite", file_paths: dict = None) -> dict:
+    conn = get_engine(engine, project_path, file_paths).connect()
+
+    try:
+        return execute_sql_query(conn, sql_query, offset=offset, limit=limit)
+    finally:
+        conn.close()
+
+
+
+def summarize_sql_result(result: dict, preview_rows: int = 5) -> str:
+    if result.get("timed_out"):
+        return f"{result['error']}. Try narrowing the question, e.g. with a filter or an aggregate."
+
+    if result.get("error"):
+        return f"Error executing SQL: {result['error']}"
+
+    rows = result.get("rows", [])
+    total_rows = result.get("total_rows")
+    total_text = f"{total_rows:,}" if total_rows is not None else "unknown"
+
+    if not rows:
+        return "The query returned no rows."
+
+    preview = pd.DataFrame(rows[:preview_rows], columns=result.get("columns", [])).to_string(index=False)
+    return f"Query returned {total_text} rows (showing the first {min(preview_rows, len(rows))}):\n{preview}"
+
+
+
+def execute_visualization_code(viz_code: str) -> bytes:
+    """Render generated plotting code in the sandboxed worker pool and return PNG bytes"""
+    return render_visualization(viz_code)
 
 
 
@@ -219,11 +335,12 @@ def branch_node(state: WorkflowState) -> WorkflowState:
         state = sql_node(state)
         sql_query = state.get("agent_response", "")
         if sql_query and state.get("db_connection"):
-            try:
-                df_result = execute_sql_query(state["db_connection"], sql_query)
-                state["agent_response"] = df_result.to_string()
-            except Exception as e:
-                state["agent_response"] = f"Error executing SQL: {str(e)}"
+            sql_result = execute_sql_query(state["db_connection"], sql_query)
+            state["sql_result"] = sql_result
+
+            if (state.get("engine") or "sqlite") == "sqlite" and not sql_result.get("error"):
+                record_and_advise(state["project_path"], [sql_query])
+            state["agent_response"] = summarize_sql_result(sql_result)
         return state
     
     elif action == "alert":
@@ -232,10 +349,9 @@ def branch_node(state: WorkflowState) -> WorkflowState:
         alert_text = state.get("agent_response", "")
         
         if alert_text:
-            current_project = st.session_state.current_project
             create_custom_alert(
                 message=alert_text,
-                project_name=current_project
+                project_name=state["project_name"]
             )
             state["agent_response"] = alert_text
         return state
@@ -245,8 +361,12 @@ def branch_node(state: WorkflowState) -> WorkflowState:
         state = visualization_node(state)
         viz_code = state.get("agent_response", "")
         if viz_code:
-            result = execute_visualization_code(viz_code)
-            state["agent_response"] = result
+            try:
+                state["image"] = execute_visualization_code(viz_code)
+                state["agent_response"] = "Here is the visualization you asked for."
+            except VisualizationError as e:
+                print("Error executing visualization code:", e)
+                state["agent_response"] = f"Error: {str(e)}"
         return state
     
     elif action == "comparison":
@@ -264,42 +384,122 @@ def branch_node(state: WorkflowState) -> WorkflowState:
 
 
 
-def create_chat_workflow() -> StateGraph:
-    """Create and return the chat workflow graph"""
+def create_chat_workflow(with_branch: bool = True) -> StateGraph:
+    """Create and return the chat workflow graph, optionally stopping after routing"""
     workflow = StateGraph(WorkflowState)
     
     workflow.add_node("load_data", load_csv_to_sql_node)
     workflow.add_node("extract_metadata", extract_metadata_node)
     workflow.add_node("route", route_query_node)
-    workflow.add_node("branch", branch_node)
     
     workflow.set_entry_point("load_data")
     workflow.add_edge("load_data", "extract_metadata")
     workflow.add_edge("extract_metadata", "route")
-    workflow.add_edge("route", "branch")
-    workflow.add_edge("branch", END)
+
+    if with_branch:
+        workflow.add_node("branch", branch_node)
+        workflow.add_edge("route", "branch")
+        workflow.add_edge("branch", END)
+    else:
+        workflow.add_edge("route", END)
     
     return workflow.compile()
 
 
 
-def process_chat_query(user_query: str, selected_insights: dict = None) -> str:
+_apps = {}
+_apps_lock = threading.Lock()
+
+
+
+def get_chat_app(with_branch: bool = True):
+    """Chat workflow compiled on first use rather than at import"""
+
+    with _apps_lock:
+        if with_branch not in _apps:
+            _apps[with_branch] = create_chat_workflow(with_branch)
 
-    state: WorkflowState = {
+    return _apps[with_branch]
+
+STREAMING_ACTIONS = ("comparison", "insight details", "chat")
+
+
+
+def create_initial_state(user_query: str, selected_insights: dict = None, project_name: str = None, project: dict = None) -> WorkflowState:
+    """Initial workflow state; the project comes from the session unless passed in (e.g. from outside Streamlit)"""
+    if project is None:
+        if project_name is None:
+            project_name = st.session_state.current_project
+        project = st.session_state.projects[project_name]
+
+    return {
         "user_query": user_query,
+        "project_name": project_name,
+        "project_path": project["path"],
+        "file_paths": {f: project.get("file_paths", {}).get(f) for f in project.get("files", [])},
+        "engine": project.get("engine", "sqlite"),
         "columns": "",
-        "insights": json.dumps(selected_insights) if selected_insights else "",
+        "insights": json.dumps(select_relevant_insights(selected_insights, user_query)) if selected_insights else "",
         "router_response": None,
         "action": None,
         "agent_response": None,
         "db_connection": None,
-        "metadata_result": None
+        "metadata_result": None,
+        "sql_result": None,
+        "image": None,
+        "prompt_tokens": None
     }
 
-    workflow = create_chat_workflow()
-    final_state = workflow.invoke(state)
+
+
+def count_prompt_tokens(state: WorkflowState) -> int:
+    """Tokens in the variable parts of the agent prompt: query with conversation context, schema and insights"""
+    return sum(count_tokens(state.get(field) or "") for field in ("user_query", "metadata_result", "insights"))
+
+
+
+def stream_branch(state: WorkflowState) -> Iterator[str]:
+    action = state.get("action")
+    user_query = state["user_query"]
+    metadata = state.get("metadata_result", "")
+    insights = state.get("insights", "")
+
+    if action == "comparison":
+        return stream_compare_insights(user_query, insights)
+
+    elif action == "insight details":
+        return stream_insight_details(user_query, metadata, insights)
+
+    return stream_casual_chat(user_query, metadata)
+
+
+
+def process_chat_query(user_query: str, selected_insights: dict = None, project_name: str = None, project: dict = None) -> str:
+
+    state = create_initial_state(user_query, selected_insights, project_name, project)
+    final_state = get_chat_app().invoke(state)
+    print(f"Chat prompt: ~{count_prompt_tokens(final_state):,} tokens")
 
     if final_state.get("db_connection"):
         final_state["db_connection"].close()
     
-    return final_state.get("agent_response", "Sorry, I couldn't process that request.") 
\ No newline at end of file
+    return final_state.get("agent_response", "Sorry, I couldn't process that request.") 
+
+
+
+def stream_chat_query(user_query: str, selected_insights: dict = None, project_name: str = None, project: dict = None) -> Tuple[WorkflowState, Optional[Iterator[str]]]:
+    """Route the query; free-text actions return a token iterator, all others run to completion and return None"""
+    state = create_initial_state(user_query, selected_insights, project_name, project)
+    state = get_chat_app(with_branch=False).invoke(state)
+    state["prompt_tokens"] = count_prompt_tokens(state)
+
+    if state.get("action") in STREAMING_ACTIONS:
+        chunks = stream_branch(state)
+    else:
+        state = branch_node(state)
+        chunks = None
+
+    if state.get("db_connection"):
+        state["db_connection"].close()
+
+    return state, chunks
@@ -1,15 +1,25 @@
+import os
+import time
 import sqlite3
-import pandas as pd
+import threading
 from pprint import pprint
 import json
+from concurrent.futures import ThreadPoolExecutor
 from typing import TypedDict, Dict, Any, Optional
 from insighter.models.insight_agents import get_metadata_result, get_insight_questions, get_sql_queries, insights_creation
+from insighter.utils.database import ensure_ingested, file_fingerprint, table_name_for
+from insighter.config.settings import INSIGHT_QUERY_TIMEOUT_SECONDS, INSIGHT_SQL_WORKERS, INSIGHT_CHECKPOINT_DB_NAME
+from insighter.utils.engines import QueryTimeoutError, get_engine, query_deadline, to_json_row
+from insighter.utils.index_advisor import record_and_advise
+from insighter.utils.metadata_cache import load_metadata_cache, get_cached_metadata, set_cached_metadata
 from langgraph.graph import StateGraph, END
 
 
 
 class WorkflowState(TypedDict):
-    db_connection: Optional[sqlite3.Connection]
+    engine: Optional[str]
+    project_path: Optional[str]
+    table_name: Optional[str]
     metadata_result: Optional[str]
     insight_questions: Optional[str]
     sql_queries: Optional[Dict[str, Any]]
@@ -20,26 +30,56 @@ class WorkflowState(TypedDict):
 
 
 
+def get_state_engine(state: WorkflowState):
+    file_path = state.get("file_path", "data.csv")
+    return get_engine(state.get("engine") or "sqlite", state["project_path"], {os.path.basename(file_path): file_path})
+
+
+
 def load_csv_to_sql_node(state: WorkflowState) -> Dict[str, Any]:
     file_path = state.get("file_path", "data.csv")
-    df = pd.read_csv(file_path)
-    conn = sqlite3.connect(":memory:")
-    df.to_sql("sales_marketing_data", conn, if_exists="replace", index=False)
-    return {"db_connection": conn}
+    file_name = os.path.basename(file_path)
+    project_path = os.path.dirname(os.path.abspath(file_path))
+
+    if (state.get("engine") or "sqlite") == "sqlite":
+        table_name = ensure_ingested(project_path, file_name, file_path)
+    else:
+        table_name = table_name_for(file_name)
+
+    return {"project_path": project_path, "table_name": table_name}
 
 
 
 def extract_metadata_node(state: WorkflowState) -> Dict[str, Any]:
-    conn = state["db_connection"]
-    columns = conn.execute("PRAGMA table_info(sales_marketing_data)").fetchall()
-    metadata_output = get_metadata_result(columns)
+    table_name = state["table_name"]
+    project_path = state["project_path"]
+    file_path = state.get("file_path", "data.csv")
+    file_name = os.path.basename(file_path)
+    fingerprint = file_fingerprint(file_path)
+    engine = get_state_engine(state)
+    cache = load_metadata_cache(project_path)
 
-    if isinstance(metadata_output, dict):
-        metadata_text = metadata_output.get("text", "")
-    else:
-        metadata_text = str(metadata_output)
+    metadata_text = get_cached_metadata(project_path, file_name, fingerprint, f"llm_metadata:{engine.name}", cache)
 
-    metadata_result = 'Table name : sales_marketing_data\n' + metadata_text
+    if metadata_text is None:
+        columns = get_cached_metadata(project_path, file_name, fingerprint, f"schema:{engine.name}", cache)
+
+        if columns is None:
+            conn = engine.connect()
+
+            try:
+                columns = engine.table_info(conn, table_name)
+            finally:
+                conn.close()
+
+            set_cached_metadata(project_path, file_name, fingerprint, f"schema:{engine.name}", columns)
+
+        metadata_text = json.dumps(get_metadata_result([tuple(column) for column in columns]), indent=2)
+
+        if metadata_text:
+            set_cached_metadata(project_path, file_name, fingerprint, f"llm_metadata:{engine.name}", metadata_text)
+
+    metadata_result = f'SQL dialect : {engine.dialect}\nTable name : {table_name}\n' + metadata_text
     return {"metadata_result": metadata_result}
 
 
@@ -60,53 +100,72 @@ def define_insights_node(state: WorkflowState) -> Dict[str, Any]:
 def generate_sql_node(state: WorkflowState) -> Dict[str, Any]:
     metadata_result = state["metadata_result"]
     insight_questions = state["insight_questions"]
-    sql_output = get_sql_queries(metadata_result, insight_questions)
+    sql_queries = get_sql_queries(metadata_result, insight_questions)
+    return {"sql_queries": sql_queries}
 
-    if isinstance(sql_output, dict):
-        sql_text = sql_output.get("text", "")
-    else:
-        sql_text = str(sql_output)
+
+
+def run_insight_query(engine, key: str, query_text: str) -> Dict[str, Any]:
+    start = time.perf_counter()
+    conn = engine.connect()
 
     try:
-        sql_queries = json.loads(sql_text)
-    except json.JSONDecodeError as e:
-        print(f"Error decoding SQL JSON: {e}")
-        print(f"Received text: {sql_text}")
-        raise
-    return {"sql_queries": sql_queries}
+        cursor = conn.cursor()
+        with query_deadline(cursor, INSIGHT_QUERY_TIMEOUT_SECONDS):
+            cursor.execute(query_text)
+            result = [to_json_row(row) for row in cursor.fetchall()]
+        return {"key": key, "result": result, "elapsed_ms": (time.perf_counter() - start) * 1000}
+    except QueryTimeoutError as e:
+        print(f"Dropping query {key}: {e}")
+    except Exception as e:
+        print(f"Error executing query for {key} ('{query_text}'): {e}")
+    finally:
+        conn.close()
+
+    return {"key": key, "result": None, "elapsed_ms": (time.perf_counter() - start) * 1000}
 
 
 
 def execute_sql_queries_node(state: WorkflowState) -> Dict[str, Any]:
-    conn = state["db_connection"]
     sql_queries = state["sql_queries"]
-    cursor = conn.cursor()
+    engine = get_state_engine(state)
 
     sql_queries_and_results = json.loads(json.dumps(sql_queries))
+    queries = {}
 
-    keys_to_process = list(sql_queries_and_results.get("sql_queries", {}).keys())
-
-    for key in keys_to_process:
+    for key in list(sql_queries_and_results.get("sql_queries", {}).keys()):
         value = sql_queries_and_results["sql_queries"][key]
-        try:
-            query_text = value.get("sql_query")
-            if not query_text:
-                 print(f"Skipping query {key}: 'sql_query' key missing or empty.")
-                 if key in sql_queries_and_results["sql_queries"]:
-                      del sql_queries_and_results["sql_queries"][key]
-                 continue
+        query_text = value.get("sql_query") if isinstance(value, dict) else None
 
-            cursor.execute(query_text)
-            result = cursor.fetchall()
-            if result:
-                sql_queries_and_results["sql_queries"][key]["result"] = result
-            else:
-                if key in sql_queries_and_results["sql_queries"]:
-                     del sql_queries_and_results["sql_queries"][key]
-        except Exception as e:
-            print(f"Error executing query for {key} ('{value.get('sql_query', 'N/A')}'): {e}")
-            if key in sql_queries_and_results["sql_queries"]:
-                 del sql_queries_and_results["sql_queries"][key]
+        if not query_text:
+            print(f"Skipping query {key}: 'sql_query' key missing or empty.")
+            del sql_queries_and_results["sql_queries"][key]
+            continue
+
+        queries[key] = query_text
+
+    start = time.perf_counter()
+
+    if queries:
+        with ThreadPoolExecutor(max_workers=min(INSIGHT_SQL_WORKERS, len(queries))) as executor:
+            outcomes = list(executor.map(lambda key: run_insight_query(engine, key, queries[key]), queries))
+    else:
+        outcomes = []
+
+    for outcome in outcomes:
+        key = outcome["key"]
+
+        if outcome["result"]:
+            sql_queries_and_results["sql_queries"][key]["result"] = outcome["result"]
+            sql_queries_and_results["sql_queries"][key]["execution_ms"] = round(outcome["elapsed_ms"], 1)
+        else:
+            del sql_queries_and_results["sql_queries"][key]
+
+    timings = ", ".join(f"{outcome['key']}: {outcome['elapsed_ms']:.0f} ms" for outcome in outcomes)
+    print(f"Executed {len(queries)} insight queries in {(time.perf_counter() - start) * 1000:.0f} ms ({timings})")
+
+    if (state.get("engine") or "sqlite") == "sqlite":
+        record_and_advise(state["project_path"], [queries[outcome["key"]] for outcome in outcomes if outcome["result"] is not None])
 
     return {"sql_queries_and_results": sql_queries_and_results}
 
@@ -118,19 +177,7 @@ def generate_insights_node(state: WorkflowState) -> Dict[str, Any]:
     if not sql_queries_and_results or not sql_queries_and_results.get("sql_queries"):
         return {"presentation_result": {"insights": {}}}
 
-    presentation_output = insights_creation(sql_queries_and_results)
-
-    if isinstance(presentation_output, dict):
-        presentation_text = presentation_output.get("text", "")
-    else:
-        presentation_text = str(presentation_output)
-
-    try:
-        presentation_result = json.loads(presentation_text)
-    except json.JSONDecodeError as e:
-        print(f"Error decoding presentation JSON: {e}")
-        print(f"Received text: {presentation_text}")
-        raise
+    presentation_result = insights_creation(sql_queries_and_results)
     return {"presentation_result": presentation_result}
 
 
@@ -149,38 +196,118 @@ def present_final_insights_node(state: WorkflowState) -> Dict[str, Any]:
     return {"final_dict": final_dict}
 
 
-workflow = StateGraph(WorkflowState)
+def create_insight_workflow() -> StateGraph:
+    """Build the (uncompiled) insight generation graph"""
+    workflow = StateGraph(WorkflowState)
+
+    workflow.add_node("load_data", load_csv_to_sql_node)
+    workflow.add_node("extract_metadata", extract_metadata_node)
+    workflow.add_node("define_insights", define_insights_node)
+    workflow.add_node("generate_sql", generate_sql_node)
+    workflow.add_node("execute_sql", execute_sql_queries_node)
+    workflow.add_node("generate_insights", generate_insights_node)
+    workflow.add_node("present_final", present_final_insights_node)
+
+    workflow.set_entry_point("load_data")
+    workflow.add_edge("load_data", "extract_metadata")
+    workflow.add_edge("extract_metadata", "define_insights")
+    workflow.add_edge("define_insights", "generate_sql")
+    workflow.add_edge("generate_sql", "execute_sql")
+    workflow.add_edge("execute_sql", "generate_insights")
+    workflow.add_edge("generate_insights", "present_final")
+    workflow.add_edge("present_final", END)
+
+    return workflow
+
+
+
+_app = None
+_app_lock = threading.Lock()
+
+
+
+def get_insight_app():
+    """Insight workflow without checkpointing, compiled on first use"""
+    global _app
+
+    with _app_lock:
+        if _app is None:
+            _app = create_insight_workflow().compile()
+
+    return _app
+
+
+INSIGHT_STEPS = ["load_data", "extract_metadata", "define_insights", "generate_sql", "execute_sql", "generate_insights", "present_final"]
 
-workflow.add_node("load_data", load_csv_to_sql_node)
-workflow.add_node("extract_metadata", extract_metadata_node)
-workflow.add_node("define_insights", define_insights_node)
-workflow.add_node("generate_sql", generate_sql_node)
-workflow.add_node("execute_sql", execute_sql_queries_node)
-workflow.add_node("generate_insights", generate_insights_node)
-workflow.add_node("present_final", present_final_insights_node)
 
-workflow.set_entry_point("load_data")
-workflow.add_edge("load_data", "extract_metadata")
-workflow.add_edge("extract_metadata", "define_insights")
-workflow.add_edge("define_insights", "generate_sql")
-workflow.add_edge("generate_sql", "execute_sql")
-workflow.add_edge("execute_sql", "generate_insights")
-workflow.add_edge("generate_insights", "present_final")
-workflow.add_edge("present_final", END)
+def get_checkpointer(project_path: str):
+    try:
+        from langgraph.checkpoint.sqlite import SqliteSaver
+    except ImportError:
+        print("langgraph-checkpoint-sqlite is not installed; insight runs will not be checkpointed")
+        return None
+
+    conn = sqlite3.connect(os.path.join(project_path, INSIGHT_CHECKPOINT_DB_NAME), check_same_thread=False, timeout=30)
+    return SqliteSaver(conn)
+
+
+
+def drop_stale_threads(checkpointer, file_path: str, thread_id: str):
+    stale = {
+        checkpoint.config["configurable"]["thread_id"] for checkpoint in checkpointer.list(None)
+        if checkpoint.config["configurable"]["thread_id"].startswith(f"{file_path}:")
+    }
+    for stale_thread_id in stale - {thread_id}:
+        checkpointer.delete_thread(stale_thread_id)
+
+
+
+def insight_pipeline(file_path="data.csv", engine="sqlite", on_progress=None, resume=True):
+    initial_state = {"file_path": file_path, "engine": engine}
+    final_state = dict(initial_state)
+    file_path = os.path.abspath(file_path)
+    checkpointer = get_checkpointer(os.path.dirname(file_path))
 
-app = workflow.compile()
+    config, inputs, completed = None, initial_state, 0
 
+    if checkpointer is None:
+        graph = get_insight_app()
 
-def insight_pipeline(file_path="data.csv"):
-    initial_state = {"file_path": file_path}
-    final_state = app.invoke(initial_state)
+    else:
+        thread_id = f"{file_path}:{file_fingerprint(file_path)}:{engine}"
+        config = {"configurable": {"thread_id": thread_id}}
+        graph = create_insight_workflow().compile(checkpointer=checkpointer)
+        drop_stale_threads(checkpointer, file_path, thread_id)
+
+        if not resume:
+            checkpointer.delete_thread(thread_id)
+
+        snapshot = graph.get_state(config)
+
+        if snapshot.values and not snapshot.next:
+            print(f"Insights for this version of {file_path} were already generated, reusing them")
+            checkpointer.conn.close()
+            if on_progress:
+                on_progress(INSIGHT_STEPS[-1], len(INSIGHT_STEPS), len(INSIGHT_STEPS))
+            return snapshot.values.get("final_dict")
+
+        if snapshot.next:
+            print(f"Resuming insight run for {file_path} at {snapshot.next[0]}")
+            final_state.update(snapshot.values)
+            inputs, completed = None, INSIGHT_STEPS.index(snapshot.next[0])
+
+    try:
+        for completed, update in enumerate(graph.stream(inputs, config), start=completed + 1):
+            for step, values in update.items():
+                final_state.update(values or {})
+                if on_progress:
+                    on_progress(step, completed, len(INSIGHT_STEPS))
+    finally:
+        if checkpointer is not None:
+            checkpointer.conn.close()
 
     print("\n" + "="*50 + "\nWorkflow Complete. Final Output:")
     pprint(final_state.get("final_dict"))
     print("\n" + "="*50 + "\n")
 
-    db_conn = final_state.get("db_connection")
-    if db_conn:
-        db_conn.close()
-
     return final_state.get("final_dict")
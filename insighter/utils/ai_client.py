@@ -1,9 +1,17 @@
 import os
-from openai import OpenAI
+import threading
+from insighter.utils.llm_gateway import get_http_client
 
-api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
+_client = None
+_client_lock = threading.Lock()
 
 def get_client():
-    """Get the OpenAI client instance"""
-    return client
\ No newline at end of file
+    """Get the OpenAI client instance, created on first use"""
+    global _client
+
+    with _client_lock:
+        if _client is None:
+            from openai import OpenAI
+            _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=get_http_client(), max_retries=0)
+
+    return _client
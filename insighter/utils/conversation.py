@@ -0,0 +1,131 @@
+import os
+import re
+import hashlib
+import threading
+
+_WORD_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+ENCODING_URL = "https://openaipublic.blob.core.windows.net/encodings/cl100k_base.tiktoken"
+
+_encoding = None
+_encoding_requested = False
+_encoding_lock = threading.Lock()
+
+
+def _load_encoding():
+    global _encoding
+
+    try:
+        import tiktoken
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"tiktoken unavailable, using an approximate token count: {e}")
+
+
+def _get_encoding():
+    """
+    cl100k_base once tiktoken has it on disk, otherwise None.
+    A missing encoding is downloaded in a background thread (when TIKTOKEN_DOWNLOAD allows) so counting never waits on the network.
+    """
+    global _encoding_requested
+
+    with _encoding_lock:
+        if _encoding is not None or _encoding_requested:
+            return _encoding
+        _encoding_requested = True
+
+    from insighter.config.settings import TIKTOKEN_CACHE_DIR, TIKTOKEN_DOWNLOAD
+
+    cache_dir = os.environ.setdefault("TIKTOKEN_CACHE_DIR", TIKTOKEN_CACHE_DIR)
+    # tiktoken names its cached files by the SHA-1 of the source URL
+    cached = os.path.exists(os.path.join(cache_dir, hashlib.sha1(ENCODING_URL.encode()).hexdigest()))
+
+    if cached:
+        _load_encoding()
+    elif TIKTOKEN_DOWNLOAD:
+        threading.Thread(target=_load_encoding, daemon=True).start()
+    else:
+        print("tiktoken encoding is not cached and downloads are off, using an approximate token count")
+
+    return _encoding
+
+
+def count_tokens(text):
+    """Count prompt tokens locally (tiktoken when available, otherwise a word/punctuation estimate)"""
+    if not text:
+        return 0
+
+    encoding = _get_encoding()
+
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+
+    return len(_WORD_PATTERN.findall(text))
+
+
+def truncate_to_tokens(text, max_tokens):
+
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    encoding = _get_encoding()
+
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens]) + " …"
+
+    words = text.split()
+    while words and count_tokens(" ".join(words)) > max_tokens:
+        words = words[:max(1, len(words) * 3 // 4)] if len(words) > 1 else []
+    return " ".join(words) + " …"
+
+
+def compact_message(message, max_tokens=None, preview_rows=None):
+    """Shrink one chat message for use as context: tables become their shape plus first rows, long text is truncated"""
+    from insighter.config.settings import CHAT_CONTEXT_MAX_MESSAGE_TOKENS, CHAT_CONTEXT_PREVIEW_ROWS
+
+    max_tokens = CHAT_CONTEXT_MAX_MESSAGE_TOKENS if max_tokens is None else max_tokens
+    preview_rows = CHAT_CONTEXT_PREVIEW_ROWS if preview_rows is None else preview_rows
+
+    sql_result = message.get("sql_result")
+
+    if sql_result:
+        columns = sql_result.get("columns", [])
+        rows = sql_result.get("rows", [])
+        total_rows = sql_result.get("total_rows")
+        total_text = total_rows if total_rows is not None else f"{len(rows)}+"
+        preview = "\n".join(", ".join(str(value) for value in row) for row in rows[:preview_rows])
+        content = (
+            f"[Query result: {total_text} rows x {len(columns)} columns ({', '.join(columns)}). "
+            f"SQL: {sql_result.get('sql_query', '')}]\nFirst rows:\n{preview}"
+        )
+        return truncate_to_tokens(content, max_tokens)
+
+    if message.get("image"):
+        return "[Displayed a chart]"
+
+    return truncate_to_tokens(str(message.get("content", "")), max_tokens)
+
+
+def build_conversation_context(messages, budget=None):
+    """Most recent user/assistant turns that fit in the token budget; returns (context, token_count)"""
+    from insighter.config.settings import CHAT_CONTEXT_TOKEN_BUDGET
+
+    budget = CHAT_CONTEXT_TOKEN_BUDGET if budget is None else budget
+
+    lines = []
+    used_tokens = 0
+
+    for message in reversed(messages):
+
+        if message["role"] not in ["user", "assistant"]:
+            continue
+
+        line = f"{message['role'].title()}: {compact_message(message)}"
+        line_tokens = count_tokens(line)
+
+        if used_tokens + line_tokens > budget:
+            break
+
+        lines.append(line)
+        used_tokens += line_tokens
+
+    return "\n".join(reversed(lines)), used_tokens
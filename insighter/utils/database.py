@@ -1,5 +1,6 @@
 import sqlite3
 import os
+import threading
 from pathlib import Path
 
 def get_db_connection(db_path=None):
@@ -34,4 +35,235 @@ def execute_query(query, params=(), db_path=None, fetch_all=True):
         results = {"affected_rows": cursor.rowcount}
     
     conn.close()
-    return results 
\ No newline at end of file
+    return results 
+
+FILES_TABLE = "_insighter_files"
+
+# Bumped when the way files are stored changes, so existing stores are re-ingested
+STORE_FORMAT = 2
+
+def get_project_db_path(project_path):
+
+    from insighter.config.settings import PROJECT_DB_NAME
+    return os.path.join(project_path, PROJECT_DB_NAME)
+
+def table_name_for(file_name):
+    return file_name.replace('.', '_').replace(' ', '_')
+
+def file_fingerprint(file_path):
+    """Cheap change detector for a data file: size plus modification time"""
+    stat = os.stat(file_path)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+def open_project_db(project_path, read_only=True, timeout=30):
+    """Connection to the project store; writers wait up to timeout seconds for another writer's lock"""
+    db_path = get_project_db_path(project_path)
+
+    if read_only:
+        uri = f"{Path(os.path.abspath(db_path)).as_uri()}?mode=ro"
+        return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+    os.makedirs(project_path, exist_ok=True)
+    conn = sqlite3.connect(db_path, check_same_thread=False, timeout=timeout)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {FILES_TABLE} ("
+        "file_name TEXT PRIMARY KEY, table_name TEXT NOT NULL, fingerprint TEXT NOT NULL, stats TEXT)"
+    )
+
+    if "stats" not in {row[1] for row in conn.execute(f"PRAGMA table_info({FILES_TABLE})")}:
+        conn.execute(f"ALTER TABLE {FILES_TABLE} ADD COLUMN stats TEXT")
+
+    return conn
+
+def list_data_tables(conn):
+
+    rows = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE '\\_insighter%' ESCAPE '\\' ORDER BY name"
+    ).fetchall()
+    return [row[0] for row in rows]
+
+def get_ingested_files(project_path):
+
+    if not os.path.exists(get_project_db_path(project_path)):
+        return {}
+
+    conn = open_project_db(project_path, read_only=True)
+
+    try:
+        return read_manifest(conn)
+    finally:
+        conn.close()
+
+def read_manifest(conn):
+
+    import json
+
+    try:
+        rows = conn.execute(f"SELECT file_name, table_name, fingerprint, stats FROM {FILES_TABLE}").fetchall()
+    except sqlite3.OperationalError:
+        try:
+            rows = [row + (None,) for row in conn.execute(f"SELECT file_name, table_name, fingerprint FROM {FILES_TABLE}").fetchall()]
+        except sqlite3.OperationalError:
+            rows = []
+
+    return {
+        file_name: {"table_name": table_name, "fingerprint": fingerprint, "stats": json.loads(stats) if stats else None}
+        for file_name, table_name, fingerprint, stats in rows
+    }
+
+def _current_rss_mb():
+    """Resident set size right now, from /proc (None where it is not available)"""
+
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class _PeakRSSSampler:
+    """
+    Highest current RSS seen while the block runs, sampled every interval seconds from a background thread.
+    This is the process's resident size during the block (not the ru_maxrss lifetime high-water mark);
+    spikes shorter than the interval can be missed. peak_mb is None where /proc is not available.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak_mb = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _record(self):
+        current = _current_rss_mb()
+        if current is not None:
+            self.peak_mb = max(self.peak_mb or 0.0, current)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._record()
+
+    def __enter__(self):
+        self._record()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._record()
+
+def ingest_file(project_path, file_name, file_path, chunk_rows=None, sample_rows=None):
+    """
+    Stream a CSV into the project store in chunks with compact column types, replacing any previous copy in one transaction.
+    stats["peak_rss_mb"] is the highest current RSS sampled in the background while the chunks are parsed and inserted.
+    """
+    import time
+    import json
+    import pandas as pd
+    from insighter.config.settings import INGEST_CHUNK_ROWS, INGEST_SAMPLE_ROWS
+    from insighter.utils.dtypes import SQLITE_TYPES, compact_dataframe, infer_column_kinds, infer_date_formats, memory_mb, to_sql_rows
+    from insighter.utils.metadata_cache import drop_cached_metadata
+
+    chunk_rows = INGEST_CHUNK_ROWS if chunk_rows is None else chunk_rows
+    sample_rows = INGEST_SAMPLE_ROWS if sample_rows is None else sample_rows
+
+    start = time.perf_counter()
+    table_name = table_name_for(file_name)
+    fingerprint = file_fingerprint(file_path)
+    sample = pd.read_csv(file_path, nrows=sample_rows)
+    kinds = infer_column_kinds(sample)
+    date_formats = infer_date_formats(sample, kinds)
+
+    columns_sql = ", ".join(f'"{str(column).replace(chr(34), chr(34) * 2)}" {SQLITE_TYPES[kind]}' for column, kind in kinds.items())
+    placeholders = ", ".join("?" for _ in kinds)
+    rows = 0
+    memory_before = memory_after = 0.0
+    rss = _PeakRSSSampler()
+
+    conn = open_project_db(project_path, read_only=False)
+
+    try:
+        conn.execute("PRAGMA synchronous=NORMAL")
+
+        with conn:
+            conn.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+            conn.execute(f'CREATE TABLE "{table_name}" ({columns_sql})')
+
+            with rss:
+                for chunk in pd.read_csv(file_path, chunksize=chunk_rows):
+                    memory_before += memory_mb(chunk)
+                    chunk = compact_dataframe(chunk, kinds, date_formats=date_formats)
+                    memory_after += memory_mb(chunk)
+
+                    conn.executemany(f'INSERT INTO "{table_name}" VALUES ({placeholders})', to_sql_rows(chunk, kinds))
+                    rows += len(chunk)
+
+            elapsed = time.perf_counter() - start
+            stats = {
+                "format": STORE_FORMAT,
+                "rows": rows,
+                "seconds": round(elapsed, 3),
+                "rows_per_second": round(rows / elapsed) if elapsed > 0 else None,
+                "peak_rss_mb": round(rss.peak_mb, 1) if rss.peak_mb is not None else None,
+                "memory_mb_before": round(memory_before, 2),
+                "memory_mb_after": round(memory_after, 2),
+                "column_kinds": kinds,
+            }
+            conn.execute(
+                f"INSERT OR REPLACE INTO {FILES_TABLE} (file_name, table_name, fingerprint, stats) VALUES (?, ?, ?, ?)",
+                (file_name, table_name, fingerprint, json.dumps(stats))
+            )
+    finally:
+        conn.close()
+
+    drop_cached_metadata(project_path, file_name)
+
+    print(
+        f"Ingested {file_name}: {rows:,} rows in {stats['seconds']:.2f}s ({stats['rows_per_second'] or 0:,} rows/s, "
+        f"peak RSS {stats['peak_rss_mb'] or 0:.0f} MB, in-memory {memory_before:.1f} MB -> {memory_after:.1f} MB with compact types)"
+    )
+    return table_name
+
+def drop_file(project_path, file_name):
+
+    if not os.path.exists(get_project_db_path(project_path)):
+        return
+
+    conn = open_project_db(project_path, read_only=False)
+
+    try:
+        with conn:
+            conn.execute(f'DROP TABLE IF EXISTS "{table_name_for(file_name)}"')
+            conn.execute(f"DELETE FROM {FILES_TABLE} WHERE file_name = ?", (file_name,))
+    finally:
+        conn.close()
+
+def ensure_ingested(project_path, file_name, file_path, ingested=None):
+    """Ingest a file only if it is missing from the store or changed on disk"""
+    if ingested is None:
+        ingested = get_ingested_files(project_path)
+
+    entry = ingested.get(file_name)
+
+    if entry and entry["fingerprint"] == file_fingerprint(file_path) and (entry.get("stats") or {}).get("format") == STORE_FORMAT:
+        return entry["table_name"]
+
+    return ingest_file(project_path, file_name, file_path)
+
+def sync_project_db(project_path, file_paths):
+    """Bring the project store in line with the project's CSV files"""
+    ingested = get_ingested_files(project_path)
+
+    for file_name, file_path in file_paths.items():
+
+        if file_path and file_path.endswith('.csv') and os.path.exists(file_path):
+            try:
+                ensure_ingested(project_path, file_name, file_path, ingested)
+            except Exception as e:
+                print(f"Error loading {file_name}: {e}")
+
+    for file_name in ingested:
+
+        if file_name not in file_paths:
+            drop_file(project_path, file_name)
@@ -0,0 +1,185 @@
+import warnings
+from collections import Counter
+import pandas as pd
+
+SQLITE_TYPES = {
+    "boolean": "INTEGER",
+    "integer": "INTEGER",
+    "real": "REAL",
+    "date": "DATE",
+    "datetime": "TIMESTAMP",
+    "category": "TEXT",
+    "text": "TEXT",
+}
+
+ISO_FORMATS = {"date": "%Y-%m-%d", "datetime": "%Y-%m-%d %H:%M:%S"}
+# Directives a date format needs: a year, a month and a day
+DATE_PARTS = (("%Y", "%y"), ("%m", "%b", "%B"), ("%d",))
+
+
+def parse_dates(values, date_format=None):
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        if date_format:
+            return pd.to_datetime(values, format=date_format, errors="coerce")
+        return pd.to_datetime(values, errors="coerce")
+
+
+def guess_date_format(values, date_ratio=0.95):
+    """
+    Parse format shared by at least date_ratio of the distinct values, or None.
+    The format must name a year, month and day, so times ("10:30") and fractions ("1/2") are never read as dates.
+    ISO dates and timestamps mixed in one column share ISO8601.
+    """
+    from pandas.tseries.api import guess_datetime_format
+
+    distinct = values.dropna().astype(str).unique()[:100]
+
+    if not len(distinct):
+        return None
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        guessed = Counter(guess_datetime_format(value) for value in distinct)
+
+    if guessed.get(None, 0) > len(distinct) * (1 - date_ratio):
+        return None
+    guessed.pop(None, None)
+
+    if not all(any(part in fmt for part in parts) for fmt in guessed for parts in DATE_PARTS):
+        return None
+
+    if all(fmt.startswith("%Y-%m-%d") for fmt in guessed):
+        return "ISO8601"
+
+    fmt, count = guessed.most_common(1)[0]
+    return fmt if count >= len(distinct) * date_ratio else None
+
+
+def infer_column_kinds(sample, category_ratio=None, date_ratio=0.95):
+    """Classify each column of a sample as boolean, integer, real, date, datetime, category or text"""
+    from insighter.config.settings import INGEST_CATEGORY_RATIO
+
+    category_ratio = INGEST_CATEGORY_RATIO if category_ratio is None else category_ratio
+    kinds = {}
+
+    for column in sample.columns:
+        values = sample[column]
+        non_null = values.dropna()
+        dtype_kind = values.dtype.kind
+
+        if dtype_kind == "b":
+            kinds[column] = "boolean"
+
+        elif dtype_kind in "iu":
+            kinds[column] = "integer"
+
+        elif dtype_kind == "f":
+            kinds[column] = "integer" if len(non_null) and (non_null % 1 == 0).all() else "real"
+
+        elif dtype_kind == "M":
+            kinds[column] = "date" if (non_null == non_null.dt.normalize()).all() else "datetime"
+
+        elif non_null.empty:
+            kinds[column] = "text"
+
+        else:
+            text = non_null.astype(str)
+            date_format = guess_date_format(text, date_ratio) if text.str.contains(r"\d[-/:.]\d").mean() >= date_ratio else None
+            parsed = parse_dates(text, date_format) if date_format else None
+
+            if parsed is not None and parsed.notna().mean() >= date_ratio:
+                parsed = parsed.dropna()
+                kinds[column] = "date" if (parsed == parsed.dt.normalize()).all() else "datetime"
+
+            elif text.nunique() <= len(text) * category_ratio:
+                kinds[column] = "category"
+
+            else:
+                kinds[column] = "text"
+
+    return kinds
+
+
+def infer_date_formats(sample, kinds):
+    """One parse format per date column, guessed from a sample so every chunk of a file is parsed the same way"""
+    formats = {}
+
+    for column, kind in kinds.items():
+        if kind in ISO_FORMATS and sample[column].dtype.kind != "M":
+            date_format = guess_date_format(sample[column])
+            if date_format:
+                formats[column] = date_format
+
+    return formats
+
+
+def compact_dataframe(df, kinds=None, use_arrow=None, date_formats=None):
+    """
+    Dates as datetime64, repeated strings as categoricals, numbers downcast where lossless, text optionally Arrow-backed.
+    Date values that do not parse are kept as written and the rest become ISO text, so each value is stored the same way whichever chunk it is in.
+    """
+    from insighter.config.settings import INGEST_ARROW_DTYPES
+
+    kinds = infer_column_kinds(df) if kinds is None else kinds
+    date_formats = infer_date_formats(df, kinds) if date_formats is None else date_formats
+    use_arrow = INGEST_ARROW_DTYPES if use_arrow is None else use_arrow
+    columns = {}
+
+    for column in df.columns:
+        values = df[column]
+        kind = kinds.get(column, "text")
+
+        if kind in ISO_FORMATS and values.dtype.kind != "M" and date_formats.get(column):
+            parsed = parse_dates(values, date_formats[column])
+            unparsed = parsed.isna() & values.notna()
+
+            if not unparsed.any():
+                values = parsed
+            else:
+                values = parsed.dt.strftime(ISO_FORMATS[kind]).astype(object).where(~unparsed, values)
+
+        elif kind == "category":
+            values = values.astype("category")
+
+        elif kind in ("integer", "real") and values.dtype.kind in "iuf":
+            if values.dtype.kind in "iu" or (kind == "integer" and values.notna().all()):
+                values = pd.to_numeric(values, downcast="integer")
+            else:
+                downcast = values.astype("float32")
+                if ((downcast.astype("float64") == values) | values.isna()).all():
+                    values = downcast
+
+        elif kind == "text" and use_arrow:
+            try:
+                values = values.astype("string[pyarrow]")
+            except ImportError:
+                pass
+
+        columns[column] = values
+
+    return pd.DataFrame(columns, index=df.index)
+
+
+def to_sql_rows(df, kinds=None):
+    """Row tuples for executemany: datetimes as ISO text in the format of the column's kind, missing values as None"""
+    kinds = kinds or {}
+    columns = {}
+
+    for column in df.columns:
+        values = df[column]
+
+        if values.dtype.kind == "M":
+            kind = kinds.get(column)
+            if kind not in ISO_FORMATS:
+                kind = "date" if (values.dropna() == values.dropna().dt.normalize()).all() else "datetime"
+            values = values.dt.strftime(ISO_FORMATS[kind])
+
+        columns[column] = values.astype(object).where(values.notna(), None)
+
+    return zip(*columns.values()) if columns else iter(())
+
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
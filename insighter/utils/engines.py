@@ -0,0 +1,152 @@
+import os
+import time
+import sqlite3
+import decimal
+import threading
+from contextlib import contextmanager
+from insighter.utils.database import get_project_db_path, list_data_tables, open_project_db, table_name_for
+
+
+class QueryTimeoutError(Exception):
+    pass
+
+
+@contextmanager
+def query_deadline(conn, timeout):
+    """Cancel what conn (a connection or cursor) runs inside the block after timeout seconds: SQLite via its progress handler, DuckDB via interrupt()"""
+    if not timeout:
+        yield
+        return
+
+    if isinstance(conn, sqlite3.Cursor):
+        conn = conn.connection
+
+    expired = threading.Event()
+
+    if isinstance(conn, sqlite3.Connection):
+        deadline = time.monotonic() + timeout
+
+        def check_deadline():
+            if time.monotonic() > deadline:
+                expired.set()
+                return 1
+            return 0
+
+        conn.set_progress_handler(check_deadline, 10000)
+        timer = None
+    else:
+        def interrupt():
+            expired.set()
+            conn.interrupt()
+
+        timer = threading.Timer(timeout, interrupt)
+        timer.daemon = True
+        timer.start()
+
+    try:
+        yield
+    except Exception as e:
+        if expired.is_set():
+            raise QueryTimeoutError(f"Query exceeded the {timeout:g}s budget and was cancelled") from e
+        raise
+    finally:
+        if timer is not None:
+            timer.cancel()
+        else:
+            conn.set_progress_handler(None, 0)
+
+
+class SQLiteEngine:
+    """Queries the project's ingested SQLite store"""
+
+    name = "sqlite"
+    dialect = "SQLite"
+
+    def __init__(self, project_path, file_paths=None):
+        self.project_path = project_path
+        self.file_paths = file_paths or {}
+
+    def is_available(self):
+        return os.path.exists(get_project_db_path(self.project_path))
+
+    def connect(self):
+        return open_project_db(self.project_path, read_only=True)
+
+    def list_tables(self, conn):
+        return list_data_tables(conn)
+
+    def table_info(self, conn, table_name):
+        return conn.execute(f'PRAGMA table_info("{table_name}")').fetchall()
+
+
+class DuckDBEngine:
+    """Queries the project's CSV/Parquet files in place with DuckDB's vectorized, multi-threaded executor"""
+
+    name = "duckdb"
+    dialect = "DuckDB"
+
+    def __init__(self, project_path, file_paths=None):
+        self.project_path = project_path
+        self.file_paths = file_paths or {}
+
+    def _sources(self):
+        return {
+            file_name: file_path for file_name, file_path in self.file_paths.items()
+            if file_path and file_path.endswith(('.csv', '.parquet')) and os.path.exists(file_path)
+        }
+
+    def is_available(self):
+        return bool(self._sources())
+
+    def connect(self):
+        try:
+            import duckdb
+        except ImportError:
+            raise ImportError("The DuckDB query engine requires the 'duckdb' package (pip install duckdb)")
+
+        from insighter.config.settings import DUCKDB_THREADS
+
+        conn = duckdb.connect(":memory:", config={"threads": DUCKDB_THREADS} if DUCKDB_THREADS else {})
+
+        for file_name, file_path in self._sources().items():
+            reader = "read_parquet" if file_path.endswith('.parquet') else "read_csv_auto"
+            source = os.path.abspath(file_path).replace("'", "''")
+            conn.execute(f"CREATE VIEW \"{table_name_for(file_name)}\" AS SELECT * FROM {reader}('{source}')")
+
+        return conn
+
+    def list_tables(self, conn):
+        rows = conn.execute("SELECT table_name FROM information_schema.tables ORDER BY table_name").fetchall()
+        return [row[0] for row in rows]
+
+    def table_info(self, conn, table_name):
+        return conn.execute(f"PRAGMA table_info('{table_name}')").fetchall()
+
+
+def to_json_row(row):
+    """Convert engine-specific values (dates, decimals, ...) into JSON-serialisable ones"""
+    values = []
+
+    for value in row:
+        if value is None or isinstance(value, (str, int, float, bool)):
+            values.append(value)
+        elif isinstance(value, decimal.Decimal):
+            values.append(float(value))
+        else:
+            values.append(str(value))
+
+    return values
+
+
+ENGINES = {
+    SQLiteEngine.name: SQLiteEngine,
+    DuckDBEngine.name: DuckDBEngine,
+}
+
+
+def get_engine(name, project_path, file_paths=None):
+
+    if name not in ENGINES:
+        raise ValueError(f"Unknown query engine '{name}'. Available engines: {', '.join(ENGINES)}")
+
+    return ENGINES[name](project_path, file_paths)
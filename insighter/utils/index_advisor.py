@@ -0,0 +1,300 @@
+import re
+import time
+import threading
+from collections import defaultdict
+from insighter.utils.database import list_data_tables, open_project_db
+from insighter.utils.engines import query_deadline
+
+QUERY_LOG_TABLE = "_insighter_query_log"
+INDEX_REPORT_TABLE = "_insighter_index_report"
+QUERY_LOG_LIMIT = 1000
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_TABLE_REFERENCE = re.compile(r'\b(?:FROM|JOIN)\s+(?:"([^"]+)"|([A-Za-z_]\w*))', re.IGNORECASE)
+_CLAUSE = re.compile(
+    r"\b(WHERE|ON|GROUP\s+BY)\b(.*?)(?=\b(?:WHERE|JOIN|GROUP\s+BY|HAVING|ORDER\s+BY|LIMIT|UNION|LEFT|RIGHT|INNER|CROSS|SELECT)\b|;|$)",
+    re.IGNORECASE | re.DOTALL
+)
+_IDENTIFIER = re.compile(r'"([^"]+)"|\b([A-Za-z_]\w*)\b')
+_READ_QUERY = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+_running = set()
+_running_lock = threading.Lock()
+
+
+def _ensure_tables(conn):
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {QUERY_LOG_TABLE} (sql_query TEXT NOT NULL, recorded_at REAL NOT NULL)")
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {INDEX_REPORT_TABLE} ("
+        "index_name TEXT PRIMARY KEY, table_name TEXT, column_name TEXT, uses INTEGER, "
+        "before_ms REAL, after_ms REAL, speedup REAL, kept INTEGER, created_at REAL, row_count INTEGER)"
+    )
+
+    if "row_count" not in {row[1] for row in conn.execute(f"PRAGMA table_info({INDEX_REPORT_TABLE})")}:
+        conn.execute(f"ALTER TABLE {INDEX_REPORT_TABLE} ADD COLUMN row_count INTEGER")
+
+
+def is_read_query(sql_query):
+    """A single SELECT (or WITH ... SELECT) statement; anything else is never logged or re-run"""
+    if not sql_query or not _READ_QUERY.match(sql_query):
+        return False
+
+    statements = [statement for statement in _STRING_LITERAL.sub("''", sql_query).split(";") if statement.strip()]
+    return len(statements) == 1
+
+
+def record_queries(project_path, queries):
+    """Append successfully executed SELECT queries to the project store's query log"""
+    queries = [query for query in queries if is_read_query(query)]
+
+    if not queries:
+        return
+
+    # Called on the request path: drop the log entry rather than wait behind an index build
+    conn = open_project_db(project_path, read_only=False, timeout=1)
+
+    try:
+        with conn:
+            _ensure_tables(conn)
+            now = time.time()
+            conn.executemany(f"INSERT INTO {QUERY_LOG_TABLE} (sql_query, recorded_at) VALUES (?, ?)", [(query, now) for query in queries])
+            conn.execute(f"DELETE FROM {QUERY_LOG_TABLE} WHERE rowid <= (SELECT MAX(rowid) FROM {QUERY_LOG_TABLE}) - ?", (QUERY_LOG_LIMIT,))
+    finally:
+        conn.close()
+
+
+def extract_candidate_columns(sql_query, table_columns):
+    """Return the (table, column) pairs used in WHERE, JOIN ... ON and GROUP BY clauses"""
+    sql = _STRING_LITERAL.sub("''", sql_query)
+
+    referenced_tables = []
+    for quoted, bare in _TABLE_REFERENCE.findall(sql):
+        name = quoted or bare
+        if name in table_columns and name not in referenced_tables:
+            referenced_tables.append(name)
+
+    candidates = set()
+
+    for clause in _CLAUSE.finditer(sql):
+        for quoted, bare in _IDENTIFIER.findall(clause.group(2)):
+            identifier = quoted or bare
+
+            for table_name in referenced_tables:
+                if identifier in table_columns[table_name]:
+                    candidates.add((table_name, identifier))
+
+    return candidates
+
+
+def _index_name(table_name, column_name):
+    return re.sub(r"\W", "_", f"ix_{table_name}_{column_name}")
+
+
+def _run_query(conn, query):
+    from insighter.config.settings import INSIGHT_QUERY_TIMEOUT_SECONDS
+
+    try:
+        with query_deadline(conn, INSIGHT_QUERY_TIMEOUT_SECONDS):
+            conn.execute(query).fetchall()
+        return True
+    except Exception as e:
+        print(f"Index advisor could not time query: {e}")
+        return False
+
+
+def _time_queries(conn, queries, runs):
+    """
+    Best of runs wall time (ms) for the queries, after an untimed warm-up run that also drops queries that fail.
+    None when no query could run, so there is nothing to measure.
+    """
+    usable = [query for query in queries if _run_query(conn, query)]
+
+    if not usable:
+        return None
+
+    timings = []
+
+    for _ in range(runs):
+        start = time.perf_counter()
+
+        for query in usable:
+            _run_query(conn, query)
+
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return min(timings)
+
+
+def advise_indexes(project_path, min_uses=None, min_speedup=None, max_timed_queries=3, runs=None):
+    """
+    Create indexes for frequently filtered/joined/grouped columns, keeping those that measurably help.
+    A rejected index is evaluated again once its table has grown by INDEX_ADVISOR_RETRY_GROWTH.
+    """
+    from insighter.config.settings import (
+        INDEX_ADVISOR_MIN_USES, INDEX_ADVISOR_MIN_SPEEDUP, INDEX_ADVISOR_TIMING_RUNS, INDEX_ADVISOR_RETRY_GROWTH,
+        INDEX_ADVISOR_BUSY_TIMEOUT_SECONDS
+    )
+
+    min_uses = INDEX_ADVISOR_MIN_USES if min_uses is None else min_uses
+    min_speedup = INDEX_ADVISOR_MIN_SPEEDUP if min_speedup is None else min_speedup
+    runs = INDEX_ADVISOR_TIMING_RUNS if runs is None else runs
+
+    conn = open_project_db(project_path, read_only=False, timeout=INDEX_ADVISOR_BUSY_TIMEOUT_SECONDS)
+    read_conn = None
+    report = []
+
+    try:
+        with conn:
+            _ensure_tables(conn)
+
+        # Logged queries are LLM-generated, so they are only ever re-run on a read-only connection
+        read_conn = open_project_db(project_path, read_only=True)
+        read_conn.execute("PRAGMA query_only = ON")
+
+        table_columns = {
+            table_name: {row[1] for row in conn.execute(f'PRAGMA table_info("{table_name}")')}
+            for table_name in list_data_tables(conn)
+        }
+        indexed_columns = {
+            (row[0], row[1]) for row in conn.execute(
+                "SELECT m.tbl_name, p.name FROM sqlite_master m, pragma_index_info(m.name) p WHERE m.type = 'index' AND p.seqno = 0"
+            )
+        }
+
+        rejected = dict(conn.execute(f"SELECT index_name, row_count FROM {INDEX_REPORT_TABLE} WHERE kept = 0").fetchall())
+        row_counts = {}
+
+        # Uses count every logged run of a query; the distinct queries are the ones timed
+        uses = defaultdict(int)
+        queries_by_column = defaultdict(list)
+        for sql_query, runs_logged in conn.execute(f"SELECT sql_query, COUNT(*) FROM {QUERY_LOG_TABLE} GROUP BY sql_query").fetchall():
+            if not is_read_query(sql_query):
+                continue
+
+            for candidate in extract_candidate_columns(sql_query, table_columns):
+                uses[candidate] += runs_logged
+                queries_by_column[candidate].append(sql_query)
+
+        for (table_name, column_name), queries in sorted(queries_by_column.items(), key=lambda item: -uses[item[0]]):
+            index_name = _index_name(table_name, column_name)
+            column_uses = uses[(table_name, column_name)]
+
+            if column_uses < min_uses or (table_name, column_name) in indexed_columns:
+                continue
+
+            if table_name not in row_counts:
+                row_counts[table_name] = conn.execute(f'SELECT COUNT(*) FROM "{table_name}"').fetchone()[0]
+
+            if index_name in rejected and row_counts[table_name] < (rejected[index_name] or 0) * INDEX_ADVISOR_RETRY_GROWTH:
+                continue
+
+            timed_queries = queries[:max_timed_queries]
+            create_sql = f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "{table_name}" ("{column_name}")'
+            drop_sql = f'DROP INDEX IF EXISTS "{index_name}"'
+
+            # Without, with, then without the index again, so neither side always runs on the warmer cache
+            before_ms = _time_queries(read_conn, timed_queries, runs)
+
+            if before_ms is None:
+                print(f"Index advisor: skipping {index_name}, none of its queries run")
+                continue
+
+            with conn:
+                conn.execute(create_sql)
+
+            after_ms = _time_queries(read_conn, timed_queries, runs)
+
+            with conn:
+                conn.execute(drop_sql)
+
+            again_ms = _time_queries(read_conn, timed_queries, runs)
+
+            if after_ms is None or again_ms is None:
+                print(f"Index advisor: skipping {index_name}, its queries stopped running during timing")
+                continue
+
+            before_ms = min(before_ms, again_ms)
+            speedup = before_ms / after_ms if after_ms > 0 else float("inf")
+            kept = speedup >= min_speedup
+
+            if kept:
+                with conn:
+                    conn.execute(create_sql)
+
+            with conn:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {INDEX_REPORT_TABLE} "
+                    "(index_name, table_name, column_name, uses, before_ms, after_ms, speedup, kept, created_at, row_count) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        index_name, table_name, column_name, column_uses, before_ms, after_ms, speedup, int(kept), time.time(),
+                        row_counts[table_name]
+                    )
+                )
+
+            report.append({
+                "index_name": index_name,
+                "table_name": table_name,
+                "column_name": column_name,
+                "uses": column_uses,
+                "before_ms": round(before_ms, 2),
+                "after_ms": round(after_ms, 2),
+                "speedup": round(speedup, 2),
+                "kept": kept
+            })
+            print(f"Index advisor: {index_name} speedup {speedup:.2f}x ({'kept' if kept else 'dropped'})")
+    finally:
+        if read_conn is not None:
+            read_conn.close()
+        conn.close()
+
+    return report
+
+
+def get_index_report(project_path):
+
+    conn = open_project_db(project_path, read_only=True)
+
+    try:
+        rows = conn.execute(
+            f"SELECT index_name, table_name, column_name, uses, before_ms, after_ms, speedup, kept "
+            f"FROM {INDEX_REPORT_TABLE} ORDER BY created_at DESC"
+        ).fetchall()
+    except Exception:
+        rows = []
+    finally:
+        conn.close()
+
+    columns = ["index_name", "table_name", "column_name", "uses", "before_ms", "after_ms", "speedup", "kept"]
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def _run_advisor(project_path):
+    try:
+        advise_indexes(project_path)
+    except Exception as e:
+        print(f"Index advisor failed for {project_path}: {e}")
+    finally:
+        with _running_lock:
+            _running.discard(project_path)
+
+
+def record_and_advise(project_path, queries):
+    """Log queries and run the advisor for the project in a background thread"""
+    from insighter.config.settings import INDEX_ADVISOR_ENABLED
+
+    if not INDEX_ADVISOR_ENABLED:
+        return
+
+    try:
+        record_queries(project_path, queries)
+    except Exception as e:
+        print(f"Could not record queries for index advice: {e}")
+        return
+
+    with _running_lock:
+        if project_path in _running:
+            return
+        _running.add(project_path)
+
+    threading.Thread(target=_run_advisor, args=(project_path,), daemon=True).start()
@@ -1,9 +1,9 @@
 import json
 from insighter.pipelines.insights import insight_pipeline
 
-def run_insight_pipeline(file_path):
+def run_insight_pipeline(file_path, engine="sqlite", on_progress=None, resume=True):
 
-    insights = insight_pipeline(file_path=file_path)  
+    insights = insight_pipeline(file_path=file_path, engine=engine, on_progress=on_progress, resume=resume)
     json_path = file_path.replace('.csv', '.json')
 
     with open(json_path, 'w') as f:
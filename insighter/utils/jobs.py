@@ -0,0 +1,220 @@
+import os
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+
+_queue = None
+_queue_lock = threading.Lock()
+
+ACTIVE_STATUSES = ("queued", "running")
+JOB_COLUMNS = [
+    "id", "project_name", "file_name", "file_path", "engine", "status", "step", "progress", "error", "created_at", "started_at", "finished_at",
+    "owner", "lease_until"
+]
+
+
+class JobQueue:
+    """
+    Insight generation jobs persisted in SQLite and run by background worker threads.
+    A running job holds a lease that its worker renews; once the lease expires (the process died) any queue picks the job up again.
+    """
+
+    def __init__(self, path, workers, poll_interval=1.0, lease_seconds=60.0):
+        self.path = path
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wakeup = threading.Event()
+        self._threads = []
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+
+        try:
+            with conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS jobs ("
+                    "id TEXT PRIMARY KEY, project_name TEXT, file_name TEXT, file_path TEXT NOT NULL, engine TEXT, "
+                    "status TEXT NOT NULL, step TEXT, progress REAL NOT NULL DEFAULT 0, error TEXT, "
+                    "created_at REAL NOT NULL, started_at REAL, finished_at REAL, owner TEXT, lease_until REAL)"
+                )
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+                for column, column_type in (("owner", "TEXT"), ("lease_until", "REAL")):
+                    if column not in columns:
+                        conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+                conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def start(self):
+
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"insight-job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def enqueue(self, project_name, file_name, file_path, engine="sqlite"):
+        """Queue insight generation for a file; returns the id of the already active job for it if there is one"""
+        conn = self._connect()
+
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                f"SELECT id FROM jobs WHERE file_path = ? AND status IN {ACTIVE_STATUSES} ORDER BY created_at DESC LIMIT 1",
+                (file_path,)
+            ).fetchone()
+
+            if row:
+                conn.execute("COMMIT")
+                return row[0]
+
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, project_name, file_name, file_path, engine, status, created_at) VALUES (?, ?, ?, ?, ?, 'queued', ?)",
+                (job_id, project_name, file_name, file_path, engine, time.time())
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+        self._wakeup.set()
+        return job_id
+
+    def get_job(self, job_id):
+        conn = self._connect()
+
+        try:
+            row = conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+
+        return dict(zip(JOB_COLUMNS, row)) if row else None
+
+    def latest_jobs(self, project_name):
+        """Most recent job per file of the project"""
+        conn = self._connect()
+
+        try:
+            rows = conn.execute(
+                f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE project_name = ? ORDER BY created_at", (project_name,)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        return {row[2]: dict(zip(JOB_COLUMNS, row)) for row in rows}
+
+    def _claim(self):
+        conn = self._connect()
+        now = time.time()
+
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Jobs whose worker stopped renewing the lease (its process died) are picked up again
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', step = NULL, progress = 0, owner = NULL, lease_until = NULL "
+                "WHERE status = 'running' AND (lease_until IS NULL OR lease_until < ?)",
+                (now,)
+            )
+            row = conn.execute(
+                f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+
+            if row:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, owner = ?, lease_until = ? WHERE id = ?",
+                    (now, self.owner, now + self.lease_seconds, row[0])
+                )
+
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+        return dict(zip(JOB_COLUMNS, row)) if row else None
+
+    def _update(self, job_id, **fields):
+        """Update a job this queue holds; a no-op once the lease was lost to another queue"""
+        conn = self._connect()
+
+        try:
+            assignments = ", ".join(f"{name} = ?" for name in fields)
+            cursor = conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ? AND owner = ?", (*fields.values(), job_id, self.owner))
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+
+    def _heartbeat(self, job_id, stop):
+
+        while not stop.wait(self.lease_seconds / 3):
+            try:
+                if not self._update(job_id, lease_until=time.time() + self.lease_seconds):
+                    print(f"Insight job {job_id} lease was taken over by another worker")
+                    return
+            except Exception as e:
+                print(f"Error renewing the lease of insight job {job_id}: {e}")
+
+    def _work(self):
+
+        while True:
+            try:
+                job = self._claim()
+            except Exception as e:
+                print(f"Error claiming insight job: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            self._run(job)
+
+    def _run(self, job):
+        from insighter.utils.insights import run_insight_pipeline
+        from insighter.utils.llm_gateway import set_llm_user
+
+        set_llm_user(f"jobs:{job['project_name']}")
+
+        def on_progress(step, completed, total):
+            self._update(job["id"], step=step, progress=completed / total)
+
+        print(f"Running insight job {job['id']} for {job['file_path']}")
+
+        stop = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(job["id"], stop), daemon=True).start()
+
+        try:
+            run_insight_pipeline(job["file_path"], engine=job["engine"] or "sqlite", on_progress=on_progress)
+            self._update(job["id"], status="done", progress=1.0, finished_at=time.time(), lease_until=None)
+        except Exception as e:
+            print(f"Insight job {job['id']} failed: {e}")
+            self._update(job["id"], status="failed", error=str(e), finished_at=time.time(), lease_until=None)
+        finally:
+            stop.set()
+
+
+def get_job_queue():
+    """Process-wide job queue; worker threads start on first use"""
+    global _queue
+
+    with _queue_lock:
+        if _queue is None:
+            from insighter.config.settings import JOBS_DB_PATH, JOB_WORKERS, JOB_LEASE_SECONDS
+            _queue = JobQueue(JOBS_DB_PATH, JOB_WORKERS, lease_seconds=JOB_LEASE_SECONDS)
+            _queue.start()
+
+    return _queue
+
+
+def enqueue_insight_job(project_name, file_name, file_path, engine="sqlite"):
+    return get_job_queue().enqueue(project_name, file_name, file_path, engine)
+
+
+def get_project_jobs(project_name):
+    return get_job_queue().latest_jobs(project_name)
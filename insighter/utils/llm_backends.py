@@ -0,0 +1,293 @@
+import os
+import re
+import ast
+import json
+import time
+import random
+import hashlib
+import threading
+from collections import Counter
+
+_backend = None
+_backend_lock = threading.Lock()
+
+_TABLES = re.compile(r"Tables: \[['\"]([^'\"]+)['\"]")
+_TABLE_NAME = re.compile(r"Table name : (\S+)")
+
+
+class CassetteMissError(KeyError):
+    pass
+
+
+def chain_name(chain):
+    return getattr(chain, "name", None) or type(chain).__name__
+
+
+def cassette_key(name, prompt):
+    return hashlib.sha256(f"{name}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+def _text_chunks(text):
+    return re.findall(r"\S+\s*|\s+", text) or [text]
+
+
+def _paced(chunks, first_seconds, total_seconds):
+    """Yield chunks with the first after first_seconds and the rest spread until total_seconds"""
+    time.sleep(first_seconds)
+    gap = max(0.0, total_seconds - first_seconds) / max(1, len(chunks) - 1)
+
+    for index, chunk in enumerate(chunks):
+        if index:
+            time.sleep(gap)
+        yield chunk
+
+
+class LiveBackend:
+    """Sends chain calls to the provider"""
+
+    name = "live"
+
+    def invoke(self, chain, inputs, prompt):
+        return chain.invoke(inputs)
+
+    def stream(self, chain, inputs, prompt):
+        yield from chain.stream(inputs)
+
+
+class RecordingBackend(LiveBackend):
+    """Live calls, each appended to a JSONL cassette with its chain name, prompt, response and latency"""
+
+    name = "record"
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _record(self, chain, prompt, response, latency, first_chunk=None):
+        name = chain_name(chain)
+        entry = {
+            "key": cassette_key(name, prompt), "chain": name, "prompt": prompt, "response": response,
+            "latency_ms": round(latency * 1000, 1), "first_chunk_ms": round((first_chunk or latency) * 1000, 1),
+        }
+
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def invoke(self, chain, inputs, prompt):
+        start = time.perf_counter()
+        response = chain.invoke(inputs)
+        text = response.get(chain.output_key, "") if isinstance(response, dict) else str(response)
+        self._record(chain, prompt, text, time.perf_counter() - start)
+        return response
+
+    def stream(self, chain, inputs, prompt):
+        start = time.perf_counter()
+        first_chunk = None
+        chunks = []
+
+        for chunk in chain.stream(inputs):
+            first_chunk = first_chunk or time.perf_counter() - start
+            chunks.append(chunk)
+            yield chunk
+
+        self._record(chain, prompt, "".join(chunks), time.perf_counter() - start, first_chunk)
+
+
+class ReplayBackend:
+    """Answers from a recorded cassette, optionally reproducing the recorded latency"""
+
+    name = "replay"
+
+    def __init__(self, path, latency_scale=1.0):
+        self.latency_scale = latency_scale
+        self.entries = {}
+
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.entries[entry["key"]] = entry
+
+    def _lookup(self, chain, prompt):
+        name = chain_name(chain)
+        entry = self.entries.get(cassette_key(name, prompt))
+
+        if entry is None:
+            raise CassetteMissError(
+                f"No recorded response for {name} with this prompt ({len(self.entries)} in the cassette); "
+                f"record it with INSIGHTER_LLM_BACKEND=record"
+            )
+        return entry
+
+    def invoke(self, chain, inputs, prompt):
+        entry = self._lookup(chain, prompt)
+        time.sleep(entry["latency_ms"] / 1000 * self.latency_scale)
+        return {**inputs, getattr(chain, "output_key", "text"): entry["response"]}
+
+    def stream(self, chain, inputs, prompt):
+        entry = self._lookup(chain, prompt)
+        yield from _paced(
+            _text_chunks(entry["response"]),
+            entry["first_chunk_ms"] / 1000 * self.latency_scale, entry["latency_ms"] / 1000 * self.latency_scale
+        )
+
+
+def _table_from(inputs, *fields):
+    for field in fields:
+        text = str(inputs.get(field, ""))
+        match = _TABLES.search(text) or _TABLE_NAME.search(text)
+        if match:
+            return match.group(1)
+    return "data"
+
+
+def _as_dict(value):
+    if isinstance(value, dict):
+        return value
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return {}
+
+
+def _column_names(columns):
+    if isinstance(columns, str):
+        try:
+            columns = ast.literal_eval(columns)
+        except (ValueError, SyntaxError):
+            return []
+    return [column[1] for column in columns or [] if len(column) > 1]
+
+
+def default_fake_response(name, inputs):
+    """Schema-valid stand-in output for each chain, built from the chain's inputs"""
+
+    if name == "router":
+        return json.dumps({"action": "sql database query"})
+
+    if name == "sql":
+        return json.dumps({"sql_query": f'SELECT * FROM "{_table_from(inputs, "columns")}" LIMIT 10'})
+
+    if name == "visualization":
+        return json.dumps({"visualization_code": "import matplotlib.pyplot as plt\nplt.bar(['a', 'b', 'c'], [3, 1, 2])"})
+
+    if name == "metadata":
+        return json.dumps({"metadata": {column: f"The {column} column" for column in _column_names(inputs.get("columns"))}})
+
+    if name == "insight_def":
+        return "1. How many rows are there?\n2. What do the first rows look like?"
+
+    if name == "text_to_sql":
+        table = _table_from(inputs, "metadata")
+        return json.dumps({"sql_queries": {
+            "insight_1": {"sql_query": f'SELECT COUNT(*) AS row_count FROM "{table}"'},
+            "insight_2": {"sql_query": f'SELECT * FROM "{table}" LIMIT 5'},
+        }})
+
+    if name == "insight":
+        queries = _as_dict(inputs.get("sql_queries_and_results")).get("sql_queries", {})
+        return json.dumps({"insights": {key: f"Summary of {key}" for key in queries}})
+
+    if name == "json_repair":
+        return str(inputs.get("output", "{}"))
+
+    return f"Scripted response from {name}."
+
+
+class FakeBackend:
+    """
+    Scripted responses after a simulated latency, for running the pipelines offline.
+    script maps chain names to a response or a list of responses used in turn; other chains get default_fake_response.
+    """
+
+    name = "fake"
+
+    def __init__(self, script=None, latency_ms=800.0, jitter=0.25, seed=None):
+        self.script = script or {}
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.calls = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def latency(self):
+        with self._lock:
+            spread = self._random.uniform(-self.jitter, self.jitter)
+        return max(0.0, self.latency_ms * (1 + spread)) / 1000
+
+    def respond(self, chain, inputs):
+        name = chain_name(chain)
+
+        with self._lock:
+            turn = self.calls[name]
+            self.calls[name] += 1
+
+        scripted = self.script.get(name)
+
+        if scripted is None:
+            return default_fake_response(name, inputs)
+        if isinstance(scripted, list):
+            scripted = scripted[turn % len(scripted)]
+        return scripted if isinstance(scripted, str) else json.dumps(scripted)
+
+    def invoke(self, chain, inputs, prompt):
+        response = self.respond(chain, inputs)
+        time.sleep(self.latency())
+        return {**inputs, getattr(chain, "output_key", "text"): response}
+
+    def stream(self, chain, inputs, prompt):
+        latency = self.latency()
+        yield from _paced(_text_chunks(self.respond(chain, inputs)), latency / 3, latency)
+
+
+def create_llm_backend(kind=None):
+    from insighter.config.settings import (
+        LLM_BACKEND, LLM_CASSETTE_PATH, LLM_REPLAY_LATENCY_SCALE, LLM_FAKE_LATENCY_MS, LLM_FAKE_LATENCY_JITTER, LLM_FAKE_SCRIPT
+    )
+
+    kind = kind or LLM_BACKEND
+
+    if kind == "live":
+        return LiveBackend()
+
+    if kind == "record":
+        return RecordingBackend(LLM_CASSETTE_PATH)
+
+    if kind == "replay":
+        return ReplayBackend(LLM_CASSETTE_PATH, LLM_REPLAY_LATENCY_SCALE)
+
+    if kind == "fake":
+        script = None
+        if LLM_FAKE_SCRIPT:
+            with open(LLM_FAKE_SCRIPT, encoding="utf-8") as f:
+                script = json.load(f)
+        return FakeBackend(script, LLM_FAKE_LATENCY_MS, LLM_FAKE_LATENCY_JITTER)
+
+    raise ValueError(f"Unknown LLM backend: {kind} (expected live, record, replay or fake)")
+
+
+def get_llm_backend():
+    """Process-wide LLM backend, chosen by the LLM_BACKEND setting (INSIGHTER_LLM_BACKEND)"""
+    global _backend
+
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_llm_backend()
+            if _backend.name != "live":
+                print(f"Using the {_backend.name} LLM backend")
+
+    return _backend
+
+
+def uses_provider():
+    """Whether the current backend sends calls to OpenAI, i.e. chains need a real provider model"""
+    return get_llm_backend().name in ("live", "record")
+
+
+def set_llm_backend(backend):
+    """Swap the process-wide backend, e.g. for a FakeBackend with a custom script in benchmarks"""
+    global _backend
+
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,185 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+class LLMCache:
+    """SQLite-backed response cache with TTL expiry and least-recently-used eviction"""
+
+    def __init__(self, path, max_bytes, ttl_seconds):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def make_key(model, temperature, prompt):
+        return hashlib.sha256(f"{model}\x00{temperature}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        conn = self._connect()
+
+        try:
+            with conn:
+                row = conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+
+                if row is None or now - row[1] > self.ttl_seconds:
+                    if row is not None:
+                        conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    with self._lock:
+                        self.misses += 1
+                    return None
+
+                conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        finally:
+            conn.close()
+
+        with self._lock:
+            self.hits += 1
+        return row[0]
+
+    def set(self, key, response):
+        now = time.time()
+        size = len(response.encode("utf-8")) + len(key)
+        conn = self._connect()
+
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (key, response, size, now, now)
+                )
+                self._evict(conn, now)
+        finally:
+            conn.close()
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+        if total <= self.max_bytes:
+            return
+
+        stale_keys = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access"):
+            if total <= self.max_bytes:
+                break
+            stale_keys.append((key,))
+            total -= size
+
+        conn.executemany("DELETE FROM responses WHERE key = ?", stale_keys)
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+
+def get_llm_cache():
+
+    global _cache
+
+    with _cache_lock:
+        if _cache is None:
+            from insighter.config.settings import LLM_CACHE_PATH, LLM_CACHE_MAX_BYTES, LLM_CACHE_TTL_SECONDS
+            _cache = LLMCache(LLM_CACHE_PATH, LLM_CACHE_MAX_BYTES, LLM_CACHE_TTL_SECONDS)
+
+    return _cache
+
+
+def render_prompt(chain, inputs):
+    return chain.prompt.format(**{name: inputs[name] for name in chain.prompt.input_variables})
+
+
+def chain_cache_key(chain, inputs, prompt=None):
+    """Key an LLMChain call by model, temperature and the fully rendered prompt"""
+    prompt = render_prompt(chain, inputs) if prompt is None else prompt
+    model = getattr(chain.llm, "model_name", None) or getattr(chain.llm, "model", "")
+    temperature = getattr(chain.llm, "temperature", None)
+    return LLMCache.make_key(model, temperature, prompt)
+
+
+def _cache_enabled(use_cache):
+    """Only live responses are cached, so recordings see every call and fake or replayed answers never reach live runs"""
+    from insighter.config.settings import LLM_CACHE_ENABLED
+    from insighter.utils.llm_backends import get_llm_backend
+
+    return use_cache and LLM_CACHE_ENABLED and get_llm_backend().name == "live"
+
+
+def cached_invoke(chain, inputs, use_cache=True):
+    """Serve a chain call from the cache, otherwise send it through the LLM gateway and cache the answer"""
+    from insighter.utils.llm_gateway import get_llm_gateway
+
+    prompt = render_prompt(chain, inputs)
+    key = chain_cache_key(chain, inputs, prompt)
+
+    if not _cache_enabled(use_cache):
+        return get_llm_gateway().invoke(chain, inputs, key=key, prompt=prompt)
+
+    cache = get_llm_cache()
+    cached = cache.get(key)
+
+    if cached is not None:
+        return {**inputs, chain.output_key: cached}
+
+    response = get_llm_gateway().invoke(chain, inputs, key=key, prompt=prompt)
+    text = response.get(chain.output_key, "") if isinstance(response, dict) else str(response)
+
+    if text:
+        cache.set(key, text)
+
+    return response
+
+
+def store_cached_response(chain, inputs, text, use_cache=True):
+    """Replace the cached response of a chain call, e.g. with a repaired version of it"""
+    if _cache_enabled(use_cache) and text:
+        get_llm_cache().set(chain_cache_key(chain, inputs), text)
+
+
+def cached_stream(chain, stream_chain, inputs, use_cache=True):
+    """Stream from stream_chain, caching under the key of its non-streaming twin chain"""
+    from insighter.utils.llm_gateway import get_llm_gateway
+
+    prompt = render_prompt(chain, inputs)
+
+    if not _cache_enabled(use_cache):
+        yield from get_llm_gateway().stream(stream_chain, inputs, prompt=prompt)
+        return
+
+    cache = get_llm_cache()
+    key = chain_cache_key(chain, inputs, prompt)
+    cached = cache.get(key)
+
+    if cached is not None:
+        yield cached
+        return
+
+    chunks = []
+    for chunk in get_llm_gateway().stream(stream_chain, inputs, prompt=prompt):
+        chunks.append(chunk)
+        yield chunk
+
+    if chunks:
+        cache.set(key, "".join(chunks))
@@ -0,0 +1,292 @@
+import os
+import time
+import random
+import threading
+import contextvars
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future
+
+_gateway = None
+_gateway_lock = threading.Lock()
+_http_client = None
+_models = {}
+_models_lock = threading.Lock()
+
+_current_user = contextvars.ContextVar("llm_user", default="anonymous")
+
+
+def set_llm_user(user_id):
+    """Attribute LLM calls made from the current thread/context to a user for fair queuing"""
+    _current_user.set(str(user_id))
+
+
+def get_http_client():
+    """Process-wide keep-alive HTTP client shared by every OpenAI client"""
+    global _http_client
+
+    with _models_lock:
+        if _http_client is None:
+            import httpx
+            from insighter.config.settings import LLM_HTTP_MAX_CONNECTIONS
+
+            _http_client = httpx.Client(
+                limits=httpx.Limits(max_connections=LLM_HTTP_MAX_CONNECTIONS, max_keepalive_connections=LLM_HTTP_MAX_CONNECTIONS),
+                timeout=httpx.Timeout(120.0, connect=10.0),
+            )
+
+    return _http_client
+
+
+def get_chat_model(temperature=0.9, model="gpt-3.5-turbo"):
+    """
+    Shared ChatOpenAI per (model, temperature) so its keep-alive connection pool is reused; retries are left to the gateway.
+    Backends that never reach OpenAI (fake, replay) get a placeholder model, so they run without an API key.
+    """
+    from insighter.utils.llm_backends import uses_provider
+
+    provider = uses_provider()
+    key = (model, temperature, provider)
+    client = None
+
+    if provider:
+        from dotenv import load_dotenv
+        from insighter.utils.ai_client import get_client
+
+        load_dotenv()
+        # ChatOpenAI would also hand http_client to its async client, so the pooled sync client goes in through client
+        client = get_client().chat.completions
+
+    with _models_lock:
+        if key not in _models:
+            if provider:
+                from langchain_community.chat_models import ChatOpenAI
+                _models[key] = ChatOpenAI(
+                    temperature=temperature, model=model, openai_api_key=os.getenv("OPENAI_API_KEY"), max_retries=0, client=client
+                )
+            else:
+                from langchain_core.language_models.fake_chat_models import FakeListChatModel
+                _models[key] = FakeListChatModel(responses=[""])
+
+    return _models[key]
+
+
+def is_rate_limit_error(error):
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def retry_after_seconds(error):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Blocking token bucket refilled continuously at capacity per period"""
+
+    def __init__(self, capacity, period=60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        amount = min(float(amount), self.capacity)
+        waited = 0.0
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+
+                delay = (amount - self.tokens) / self.rate
+
+            time.sleep(delay)
+            waited += delay
+
+
+class LLMGateway:
+    """
+    Single path from the chains to the provider: per-user round-robin admission under a concurrency cap,
+    request/token rate limits, coordinated backoff on 429 and coalescing of identical in-flight requests.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute, max_concurrency, max_retries, completion_tokens):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.completion_tokens = completion_tokens
+        self.stats = Counter()
+
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()
+        self._active = 0
+        self._paused_until = 0.0
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+
+    def _count(self, name, amount=1):
+
+        with self._cond:
+            self.stats[name] += amount
+
+    def stats_snapshot(self):
+
+        with self._cond:
+            return dict(self.stats)
+
+    def _acquire_slot(self, user):
+        ticket = object()
+
+        with self._cond:
+            self._queues.setdefault(user, deque()).append(ticket)
+
+            while self._active >= self.max_concurrency or self._queues[next(iter(self._queues))][0] is not ticket:
+                self._cond.wait()
+
+            queue = self._queues.pop(user)
+            queue.popleft()
+            if queue:
+                self._queues[user] = queue
+            self._active += 1
+
+    def _release_slot(self):
+
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def _admit(self, prompt):
+        from insighter.utils.conversation import count_tokens
+
+        self._count("requests")
+        self._acquire_slot(_current_user.get())
+
+        try:
+            waited = self.requests.acquire(1)
+            waited += self.tokens.acquire(count_tokens(prompt or "") + self.completion_tokens)
+            pause = self._paused_until - time.monotonic()
+
+            if pause > 0:
+                time.sleep(pause)
+                waited += pause
+
+            self._count("waited_seconds", waited)
+        except BaseException:
+            self._release_slot()
+            raise
+
+    def _backoff(self, attempt, error):
+        delay = retry_after_seconds(error) or min(60.0, 2 ** attempt) * (0.5 + random.random())
+
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+        self._count("rate_limited")
+        print(f"LLM provider rate limited the request, pausing all calls for {delay:.1f}s (attempt {attempt + 1})")
+
+    def _call(self, fn, prompt):
+
+        for attempt in range(self.max_retries + 1):
+            self._admit(prompt)
+
+            try:
+                return fn()
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.max_retries:
+                    raise
+                self._backoff(attempt, e)
+            finally:
+                self._release_slot()
+
+    def invoke(self, chain, inputs, key=None, prompt=None):
+        """Run the chain on the LLM backend through the gateway; concurrent calls with the same key share one request"""
+        from insighter.utils.llm_backends import get_llm_backend
+
+        backend = get_llm_backend()
+
+        if key is None:
+            return self._call(lambda: backend.invoke(chain, inputs, prompt), prompt)
+
+        with self._in_flight_lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+
+        if not leader:
+            self._count("coalesced")
+            return future.result()
+
+        try:
+            result = self._call(lambda: backend.invoke(chain, inputs, prompt), prompt)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.pop(key, None)
+
+    def stream(self, chain, inputs, prompt=None):
+        """Stream chain output from the LLM backend through the gateway; the slot is held until the stream is consumed"""
+        from insighter.utils.llm_backends import get_llm_backend
+
+        backend = get_llm_backend()
+
+        for attempt in range(self.max_retries + 1):
+            self._admit(prompt)
+            started = False
+
+            try:
+                for chunk in backend.stream(chain, inputs, prompt):
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                if started or not is_rate_limit_error(e) or attempt == self.max_retries:
+                    raise
+                self._backoff(attempt, e)
+            finally:
+                self._release_slot()
+
+
+def get_llm_gateway():
+
+    global _gateway
+
+    with _gateway_lock:
+        if _gateway is None:
+            from insighter.config.settings import (
+                LLM_GATEWAY_REQUESTS_PER_MINUTE, LLM_GATEWAY_TOKENS_PER_MINUTE, LLM_GATEWAY_MAX_CONCURRENCY,
+                LLM_GATEWAY_MAX_RETRIES, LLM_GATEWAY_COMPLETION_TOKENS
+            )
+            _gateway = LLMGateway(
+                LLM_GATEWAY_REQUESTS_PER_MINUTE, LLM_GATEWAY_TOKENS_PER_MINUTE, LLM_GATEWAY_MAX_CONCURRENCY,
+                LLM_GATEWAY_MAX_RETRIES, LLM_GATEWAY_COMPLETION_TOKENS
+            )
+
+    return _gateway
+
+
+def reset_llm_gateway():
+    """Drop the process-wide gateway so the next call builds a fresh one from the current settings"""
+    global _gateway
+
+    with _gateway_lock:
+        _gateway = None
+
+
+def get_gateway_stats():
+    return get_llm_gateway().stats_snapshot()
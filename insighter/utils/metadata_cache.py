@@ -0,0 +1,68 @@
+import os
+import json
+import threading
+
+_lock = threading.Lock()
+
+def get_metadata_cache_path(project_path):
+
+    from insighter.config.settings import METADATA_CACHE_NAME
+    return os.path.join(project_path, METADATA_CACHE_NAME)
+
+def load_metadata_cache(project_path):
+
+    cache_path = get_metadata_cache_path(project_path)
+
+    if not os.path.exists(cache_path):
+        return {}
+
+    try:
+        with open(cache_path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error loading metadata cache {cache_path}: {e}")
+        return {}
+
+def get_cached_metadata(project_path, file_name, fingerprint, key, cache=None):
+    """Return a cached value for a file, or None if missing or the file changed"""
+    if cache is None:
+        cache = load_metadata_cache(project_path)
+
+    entry = cache.get(file_name)
+
+    if not entry or entry.get("fingerprint") != fingerprint:
+        return None
+
+    return entry.get(key)
+
+def _write_cache(cache_path, cache):
+    """Write to a temp file and swap it in, so readers never see a partly written cache"""
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, cache_path)
+
+def set_cached_metadata(project_path, file_name, fingerprint, key, value):
+
+    cache_path = get_metadata_cache_path(project_path)
+
+    with _lock:
+        cache = load_metadata_cache(project_path)
+        entry = cache.get(file_name)
+
+        if not entry or entry.get("fingerprint") != fingerprint:
+            entry = {"fingerprint": fingerprint}
+            cache[file_name] = entry
+
+        entry[key] = value
+        _write_cache(cache_path, cache)
+
+def drop_cached_metadata(project_path, file_name):
+
+    cache_path = get_metadata_cache_path(project_path)
+
+    with _lock:
+        cache = load_metadata_cache(project_path)
+
+        if cache.pop(file_name, None) is not None:
+            _write_cache(cache_path, cache)
@@ -1,6 +1,8 @@
 import os
 import streamlit as st
 from insighter.utils.state import BASE_PATH
+from insighter.utils.database import ingest_file, drop_file
+from insighter.utils.metadata_cache import drop_cached_metadata
 import datetime
 import random
 import datetime
@@ -47,6 +49,25 @@ def delete_project(project_name):
         
     return False
 
+def add_file(project_name, file_name, data):
+
+    project = st.session_state.projects[project_name]
+    file_path = os.path.join(project["path"], file_name)
+
+    with open(file_path, "wb") as f:
+        f.write(data)
+
+    project["files"].append(file_name)
+    project["file_paths"][file_name] = file_path
+    project["insights"][file_name] = None
+
+    try:
+        ingest_file(project["path"], file_name, file_path)
+    except Exception as e:
+        print(f"Error loading {file_name}: {e}")
+
+    return file_path
+
 def delete_file(project_name, file_name):
 
     if project_name in st.session_state.projects:
@@ -60,6 +81,9 @@ def delete_file(project_name, file_name):
             
             if os.path.exists(json_path):
                 os.remove(json_path)
+
+            drop_file(project["path"], file_name)
+            drop_cached_metadata(project["path"], file_name)
             
             if file_name in project["files"]:
                 project["files"].remove(file_name)
@@ -0,0 +1,111 @@
+import re
+import json
+import math
+from collections import Counter
+from insighter.utils.conversation import count_tokens
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "how", "i", "in", "is",
+    "it", "me", "of", "on", "or", "show", "that", "the", "these", "this", "to", "was", "what", "which", "with", "you",
+}
+
+
+def tokenize(text):
+    return [token for token in _TOKEN_PATTERN.findall(str(text).lower()) if token not in STOP_WORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over small in-memory document collections"""
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.keys = list(documents)
+        self.k1 = k1
+        self.b = b
+        self.term_counts = [Counter(tokenize(documents[key])) for key in self.keys]
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+        document_frequency = Counter()
+        for counts in self.term_counts:
+            document_frequency.update(counts.keys())
+
+        total = len(self.keys)
+        self.idf = {term: math.log(1 + (total - freq + 0.5) / (freq + 0.5)) for term, freq in document_frequency.items()}
+
+    def search(self, query, k=None):
+        """Return (key, score) pairs with a positive score, best first"""
+        query_terms = tokenize(query)
+        scores = []
+
+        for key, counts, length in zip(self.keys, self.term_counts, self.lengths):
+            score = 0.0
+
+            for term in query_terms:
+                frequency = counts.get(term)
+                if not frequency:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * length / (self.average_length or 1))
+                score += self.idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+
+            if score > 0:
+                scores.append((key, score))
+
+        scores.sort(key=lambda item: item[1], reverse=True)
+        return scores[:k] if k else scores
+
+
+def insight_document(insight):
+    return " ".join([
+        insight.get("insight_question", ""),
+        insight.get("insight_summary", ""),
+        insight.get("insight_query", ""),
+    ])
+
+
+def compact_insight(insight, preview_rows):
+    compacted = {key: value for key, value in insight.items() if key != "insight_data"}
+    data = insight.get("insight_data") or []
+
+    if isinstance(data, list):
+        compacted["insight_data"] = data[:preview_rows]
+        compacted["insight_data_total_rows"] = len(data)
+    else:
+        compacted["insight_data"] = data
+
+    return compacted
+
+
+def select_relevant_insights(insights, user_query, top_k=None, token_ceiling=None, preview_rows=None):
+    """Top-k insights for the query by BM25 (selection order when nothing matches), compacted to fit the token ceiling"""
+    from insighter.config.settings import INSIGHT_RETRIEVAL_TOP_K, INSIGHT_CONTEXT_TOKEN_CEILING, INSIGHT_RESULT_PREVIEW_ROWS
+    from insighter.models.query_router import extract_current_question
+
+    top_k = INSIGHT_RETRIEVAL_TOP_K if top_k is None else top_k
+    token_ceiling = INSIGHT_CONTEXT_TOKEN_CEILING if token_ceiling is None else token_ceiling
+    preview_rows = INSIGHT_RESULT_PREVIEW_ROWS if preview_rows is None else preview_rows
+
+    if not insights:
+        return {}
+
+    index = BM25Index({key: insight_document(insight) for key, insight in insights.items()})
+    ranked = [key for key, _ in index.search(extract_current_question(user_query), top_k)]
+
+    if not ranked:
+        ranked = list(insights)[:top_k]
+
+    selected = {}
+    used_tokens = 0
+
+    for key in ranked:
+        compacted = compact_insight(insights[key], preview_rows)
+        tokens = count_tokens(json.dumps(compacted))
+
+        if selected and used_tokens + tokens > token_ceiling:
+            break
+
+        selected[key] = compacted
+        used_tokens += tokens
+
+    return selected
@@ -0,0 +1,148 @@
+import re
+from insighter.utils.engines import query_deadline
+from insighter.utils.metadata_cache import get_cached_metadata, set_cached_metadata
+
+_CAMEL_BOUNDARY = re.compile(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])")
+_WORD = re.compile(r"[a-z0-9]+")
+
+_TEXT_TYPES = ("CHAR", "TEXT", "VARCHAR", "STRING")
+_NUMERIC_TYPES = ("INT", "REAL", "FLOAT", "DOUBLE", "DECIMAL", "NUMERIC", "BIGINT")
+_KEY_HINTS = ("id", "date", "time", "month", "year")
+_AGGREGATE_WORDS = {"average", "avg", "total", "sum", "mean", "max", "min", "maximum", "minimum", "count", "highest", "lowest", "most", "least", "top"}
+
+STOP_WORDS = {
+    "a", "all", "an", "and", "are", "as", "at", "be", "by", "can", "data", "do", "does", "each", "for", "from", "get",
+    "give", "how", "i", "in", "is", "it", "list", "me", "of", "on", "or", "per", "show", "than", "that", "the", "their",
+    "there", "these", "this", "to", "was", "were", "what", "when", "where", "which", "who", "with", "you",
+}
+
+
+def _stem(word):
+    for suffix in ("ies", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)] + ("y" if suffix == "ies" else "")
+    return word
+
+
+def identifier_terms(name):
+    """Split a table/column identifier (CamelCase, snake_case, spaces) into stemmed lowercase terms"""
+    return {_stem(word) for word in _WORD.findall(_CAMEL_BOUNDARY.sub(" ", str(name)).lower())}
+
+
+def query_terms(text):
+    return {_stem(word) for word in _WORD.findall(str(text).lower()) if word not in STOP_WORDS}
+
+
+def _is_type(column_type, type_names):
+    return any(name in str(column_type).upper() for name in type_names)
+
+
+def get_value_samples(engine, conn, table_name, columns_info, project_path=None, file_name=None, fingerprint=None, cache=None, max_values=50):
+    """Distinct values of the table's low-cardinality text columns, cached per file fingerprint"""
+    cache_key = f"values:{engine.name}"
+
+    if fingerprint:
+        cached = get_cached_metadata(project_path, file_name, fingerprint, cache_key, cache)
+        if cached is not None:
+            return cached
+
+    samples = {}
+
+    for column in columns_info:
+        column_name, column_type = column[1], column[2]
+
+        if not _is_type(column_type, _TEXT_TYPES):
+            continue
+
+        try:
+            with query_deadline(conn, 2):
+                rows = conn.execute(
+                    f'SELECT DISTINCT "{column_name}" FROM "{table_name}" WHERE "{column_name}" IS NOT NULL LIMIT {max_values + 1}'
+                ).fetchall()
+        except Exception as e:
+            print(f"Could not sample values of {table_name}.{column_name}: {e}")
+            continue
+
+        if len(rows) <= max_values:
+            samples[column_name] = [str(row[0]) for row in rows]
+
+    if fingerprint:
+        set_cached_metadata(project_path, file_name, fingerprint, cache_key, samples)
+
+    return samples
+
+
+def link_schema(user_query, metadata, value_samples=None, min_confidence=None, max_columns=None):
+    """
+    Score tables and columns against the question by name, sampled values and column type.
+    Returns (linked_metadata, matched_values, confidence), or None when confidence is too low to prune.
+    """
+    from insighter.config.settings import SCHEMA_LINKING_MIN_CONFIDENCE, SCHEMA_LINKING_MAX_COLUMNS
+
+    min_confidence = SCHEMA_LINKING_MIN_CONFIDENCE if min_confidence is None else min_confidence
+    max_columns = SCHEMA_LINKING_MAX_COLUMNS if max_columns is None else max_columns
+    value_samples = value_samples or {}
+
+    terms = query_terms(user_query)
+    lowered_query = str(user_query).lower()
+
+    if not terms:
+        return None
+
+    wants_aggregate = bool(terms & _AGGREGATE_WORDS)
+    matched_terms = set()
+    table_scores = {}
+    matched_columns = {}
+    matched_values = {}
+
+    for table_name, columns in metadata.items():
+        table_terms = identifier_terms(table_name)
+        score = 2.0 * len(terms & table_terms)
+        matched_terms |= terms & table_terms
+        hits = set()
+
+        for column in columns:
+            column_name = column[1]
+            overlap = terms & identifier_terms(column_name)
+
+            if overlap:
+                score += len(overlap)
+                matched_terms |= overlap
+                hits.add(column_name)
+
+            for value in value_samples.get(table_name, {}).get(column_name, []):
+                if len(value) > 2 and re.search(rf"\b{re.escape(value.lower())}\b", lowered_query):
+                    score += 1.5
+                    matched_terms |= query_terms(value) & terms
+                    hits.add(column_name)
+                    matched_values.setdefault(f"{table_name}.{column_name}", []).append(value)
+
+        if score > 0:
+            table_scores[table_name] = score
+            matched_columns[table_name] = hits
+
+    confidence = len(matched_terms) / len(terms)
+
+    if not table_scores or confidence < min_confidence:
+        return None
+
+    best_score = max(table_scores.values())
+    linked = {}
+
+    for table_name, score in table_scores.items():
+        if score < best_score / 3:
+            continue
+
+        columns = metadata[table_name]
+
+        if len(columns) > max_columns:
+            columns = [
+                column for column in columns
+                if column[1] in matched_columns[table_name]
+                or identifier_terms(column[1]) & set(_KEY_HINTS)
+                or (wants_aggregate and _is_type(column[2], _NUMERIC_TYPES))
+            ]
+
+        linked[table_name] = columns
+
+    return linked, matched_values, confidence
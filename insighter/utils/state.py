@@ -1,11 +1,17 @@
 import os
 import streamlit as st
 import json
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from insighter.utils.llm_gateway import set_llm_user
 
 BASE_PATH = "projects"
 
 def initialize_session_state():
     os.makedirs(BASE_PATH, exist_ok=True)
+
+    ctx = get_script_run_ctx()
+    if ctx is not None:
+        set_llm_user(ctx.session_id)
     
     if "alerts" not in st.session_state:
         st.session_state.alerts = []
@@ -0,0 +1,201 @@
+import re
+import json
+import threading
+from collections import Counter
+from insighter.utils.llm_cache import cached_invoke, store_cached_response
+
+_FENCE = re.compile(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", re.DOTALL)
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+
+structured_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+class StructuredOutputError(ValueError):
+    pass
+
+
+def _record(name, outcome):
+    with _stats_lock:
+        structured_stats[outcome] += 1
+        structured_stats[f"{name}:{outcome}"] += 1
+
+
+def _loads(text):
+    return json.loads(text, strict=False)
+
+
+def _close_partial(text):
+    """Close a JSON object cut off mid-way, dropping a trailing incomplete member when needed"""
+    stack = []
+    in_string = escaped = False
+    last_comma = None
+
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+        elif char == ",":
+            last_comma = (index, list(stack))
+
+    candidates = [text + ('"' if in_string else "") + "".join(reversed(stack))]
+
+    if last_comma:
+        index, comma_stack = last_comma
+        candidates.append(text[:index] + "".join(reversed(comma_stack)))
+
+    return candidates
+
+
+def parse_json(text):
+    """Parse an LLM's JSON output, tolerating code fences, surrounding prose, trailing commas, JSON5 and truncation. Returns (data, repaired)"""
+    text = str(text or "").strip()
+
+    try:
+        return _loads(text), False
+    except json.JSONDecodeError as e:
+        error = e
+
+    fenced = _FENCE.search(text)
+    if fenced:
+        text = fenced.group(1).strip()
+
+    start = min((index for index in (text.find("{"), text.find("[")) if index >= 0), default=-1)
+    if start < 0:
+        raise StructuredOutputError(f"No JSON object found: {error}")
+
+    text = text[start:]
+    end = max(text.rfind("}"), text.rfind("]"))
+    candidates = [text[:end + 1]] if end >= 0 else []
+    candidates += [_TRAILING_COMMA.sub(r"\1", candidate) for candidate in candidates]
+    candidates += _close_partial(_TRAILING_COMMA.sub(r"\1", text))
+
+    for candidate in candidates:
+        try:
+            return _loads(candidate), True
+        except json.JSONDecodeError as e:
+            error = e
+
+    try:
+        import json5
+        return json5.loads(candidates[0] if candidates else text), True
+    except ImportError:
+        pass
+    except Exception as e:
+        error = e
+
+    raise StructuredOutputError(f"Could not parse JSON: {error}")
+
+
+def validate(data, schema, path=""):
+    """
+    Check parsed output against a small schema and return a list of problems.
+    A schema maps keys to a type, a tuple of allowed (case-insensitive) strings or a nested schema; "*" applies to every key.
+    """
+    errors = []
+
+    if not isinstance(data, dict):
+        return [f"{path or 'output'} must be a JSON object"]
+
+    for key, expected in schema.items():
+        values = data.items() if key == "*" else [(key, data.get(key))]
+
+        for name, value in values:
+            where = f"{path}.{name}" if path else name
+
+            if value is None:
+                errors.append(f"missing '{where}'")
+
+            elif isinstance(expected, dict):
+                errors.extend(validate(value, expected, where))
+
+            elif isinstance(expected, tuple):
+                if str(value).lower().strip() not in expected:
+                    errors.append(f"'{where}' must be one of {', '.join(expected)}")
+
+            elif not isinstance(value, expected):
+                errors.append(f"'{where}' must be a {expected.__name__}")
+
+            elif expected is str and not value.strip():
+                errors.append(f"'{where}' is empty")
+
+    return errors
+
+
+def describe_schema(schema):
+    """Example JSON for the repair prompt"""
+
+    def example(expected):
+        if isinstance(expected, dict):
+            return {("<key>" if key == "*" else key): example(value) for key, value in expected.items()}
+        if isinstance(expected, tuple):
+            return f"one of: {', '.join(expected)}"
+        return f"<{expected.__name__}>"
+
+    return json.dumps(example(schema), indent=2)
+
+
+def structured_invoke(chain, inputs, schema, name, repair_chain=None, use_cache=True):
+    """
+    Invoke a JSON-producing chain and return its parsed, validated output.
+    Malformed output is repaired locally first; if that fails, only this call's output is sent to repair_chain.
+    """
+    response = cached_invoke(chain, inputs, use_cache=use_cache)
+    text = response.get(chain.output_key, "") if isinstance(response, dict) else str(response)
+
+    try:
+        data, repaired = parse_json(text)
+        errors = validate(data, schema)
+    except StructuredOutputError as e:
+        data, repaired, errors = None, True, [str(e)]
+
+    if not errors:
+        _record(name, "repaired_locally" if repaired else "clean")
+        if repaired:
+            store_cached_response(chain, inputs, json.dumps(data), use_cache=use_cache)
+        return data
+
+    error = "; ".join(errors)
+    print(f"Structured output from {name} needs repair: {error}")
+
+    if repair_chain is not None:
+        repair_inputs = {"output": text, "error": error, "format": describe_schema(schema)}
+        repair_response = cached_invoke(repair_chain, repair_inputs, use_cache=use_cache)
+        repair_text = repair_response.get(repair_chain.output_key, "") if isinstance(repair_response, dict) else str(repair_response)
+
+        try:
+            data, _ = parse_json(repair_text)
+            errors = validate(data, schema)
+        except StructuredOutputError as e:
+            errors = [str(e)]
+
+        if not errors:
+            _record(name, "repaired_by_llm")
+            store_cached_response(chain, inputs, json.dumps(data), use_cache=use_cache)
+            return data
+
+        error = "; ".join(errors)
+
+    _record(name, "failed")
+    raise StructuredOutputError(f"{name} returned unusable output: {error}")
+
+
+def get_structured_stats():
+
+    with _stats_lock:
+        stats = dict(structured_stats)
+
+    total = sum(stats.get(outcome, 0) for outcome in ("clean", "repaired_locally", "repaired_by_llm", "failed"))
+    stats["total"] = total
+    stats["repair_rate"] = (total - stats.get("clean", 0)) / total if total else 0.0
+    return stats
@@ -0,0 +1,200 @@
+import io
+import os
+import atexit
+import queue
+import shutil
+import tempfile
+import threading
+import multiprocessing
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class VisualizationError(Exception):
+    pass
+
+
+class VisualizationTimeout(VisualizationError):
+    pass
+
+
+def _apply_memory_limit(memory_limit_mb):
+
+    if not memory_limit_mb:
+        return
+
+    try:
+        import resource
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError) as e:
+        print(f"Could not apply visualization memory limit: {e}")
+
+
+def _render(code, plt):
+    """Execute visualization code and return the last figure it saved (or drew) as PNG bytes"""
+    captured = []
+
+    def capture_savefig(*args, **kwargs):
+        kwargs.pop("fname", None)
+        kwargs["format"] = "png"
+        buffer = io.BytesIO()
+        plt.gcf().savefig(buffer, **kwargs)
+        captured.append(buffer.getvalue())
+
+    original_savefig = plt.savefig
+    plt.savefig = capture_savefig
+    plt.show = lambda *args, **kwargs: None
+
+    try:
+        exec(code, {"__name__": "__visualization__"})
+    finally:
+        plt.savefig = original_savefig
+
+    if captured:
+        return captured[-1]
+
+    if plt.get_fignums():
+        buffer = io.BytesIO()
+        plt.gcf().savefig(buffer, format="png")
+        return buffer.getvalue()
+
+    raise VisualizationError("The visualization code did not produce a figure")
+
+
+def _worker_main(conn, memory_limit_mb):
+
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import pandas  # noqa: F401  (pre-imported so generated code starts fast)
+
+    _apply_memory_limit(memory_limit_mb)
+
+    workdir = tempfile.mkdtemp(prefix="insighter_viz_")
+    os.chdir(workdir)
+
+    while True:
+        try:
+            code = conn.recv()
+        except EOFError:
+            break
+
+        if code is None:
+            break
+
+        try:
+            conn.send(("ok", _render(code, plt)))
+        except BaseException as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+        finally:
+            plt.close("all")
+
+            for name in os.listdir(workdir):
+                path = os.path.join(workdir, name)
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    os.remove(path)
+
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+class _Worker:
+
+    def __init__(self, context, memory_limit_mb):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, memory_limit_mb), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(1)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class VisualizationPool:
+    """Pre-warmed worker processes that run generated plotting code with a timeout and memory cap"""
+
+    def __init__(self, size, timeout, memory_limit_mb):
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self._context = multiprocessing.get_context("spawn")
+        self._idle = queue.Queue()
+        self._workers = set()
+        self._lock = threading.Lock()
+
+        for _ in range(size):
+            self._add_worker()
+
+    def _add_worker(self):
+        worker = _Worker(self._context, self.memory_limit_mb)
+        with self._lock:
+            self._workers.add(worker)
+        self._idle.put(worker)
+
+    def _replace_worker(self, worker):
+        worker.kill()
+        with self._lock:
+            self._workers.discard(worker)
+        self._add_worker()
+
+    def run(self, code, timeout=None):
+        """Return PNG bytes for the figure produced by code"""
+        timeout = self.timeout if timeout is None else timeout
+        worker = self._idle.get()
+
+        try:
+            worker.conn.send(code)
+
+            if not worker.conn.poll(timeout):
+                self._replace_worker(worker)
+                raise VisualizationTimeout(f"Visualization exceeded the {timeout}s time limit")
+
+            status, payload = worker.conn.recv()
+        except (EOFError, OSError, BrokenPipeError):
+            self._replace_worker(worker)
+            raise VisualizationError("Visualization worker crashed (possibly out of memory)")
+
+        self._idle.put(worker)
+
+        if status != "ok":
+            raise VisualizationError(payload)
+
+        return payload
+
+    def shutdown(self):
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+
+        for worker in workers:
+            worker.stop()
+
+
+def get_visualization_pool():
+
+    global _pool
+
+    with _pool_lock:
+        if _pool is None:
+            from insighter.config.settings import VIZ_WORKERS, VIZ_TIMEOUT_SECONDS, VIZ_MEMORY_LIMIT_MB
+            _pool = VisualizationPool(VIZ_WORKERS, VIZ_TIMEOUT_SECONDS, VIZ_MEMORY_LIMIT_MB)
+            atexit.register(_pool.shutdown)
+
+    return _pool
+
+
+def render_visualization(code):
+    return get_visualization_pool().run(code)